@@ -23,6 +23,21 @@ def create_app(test_config=None):
 
     login_manager.init_app(app)
 
+    from .db import user_cache, ecmgr
+    user_cache.configure(max_size=app.config['USER_CACHE_MAX_SIZE'],
+                         ttl=app.config['USER_CACHE_TTL'])
+    ecmgr.init_app(app)
+
+    # first so that the whole request is timed
+    from . import metrics
+    metrics.init_app(app)
+
+    from . import fragments
+    fragments.init_app(app)
+
+    from . import resilience
+    resilience.init_app(app)
+
     try:
         os.makedirs(app.instance_path)
     except OSError:
@@ -37,6 +52,9 @@ def create_app(test_config=None):
     from .applications import bp as applications_bp
     app.register_blueprint(applications_bp)
 
+    from .api import bp as api_bp
+    app.register_blueprint(api_bp)
+
     app.add_url_rule('/', endpoint='index')
 
     return app
@@ -0,0 +1,99 @@
+import json
+from itertools import islice
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    request,
+    stream_with_context,
+)
+from flask_login import (
+    login_required,
+)
+from ..decorators import (
+    read_required,
+)
+from ..db import (
+    find_application,
+    iter_applications,
+    iter_application_events,
+)
+from ..applications import (
+    page_limit,
+    page_filters,
+)
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+APPLICATION_FIELDS = ('id', 'type', 'name', 'created_by', 'created_on')
+EVENT_FIELDS = ('id', 'type', 'parent_id', 'name', 'created_by',
+                'created_on')
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _selected_fields(available):
+    """
+    the fields requested through the comma separated fields argument
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return available
+    selected = tuple(f for f in fields.split(',') if f)
+    if not selected or any(f not in available for f in selected):
+        abort(400)
+    return selected
+
+
+def _stream(key, items, fields):
+    """
+    streams {"<key>": [...], "next": cursor} one serialized item at a time
+    items must yield at most one more item than the page holds, which
+    only determines the cursor of the next page
+    """
+    limit = page_limit(current_app.config['API_PAGE_SIZE'],
+                       current_app.config['API_MAX_PAGE_SIZE'])
+
+    def generate():
+        yield '{{"{}":['.format(key)
+        last = None
+        for i, item in enumerate(islice(items, limit + 1)):
+            if i == limit:
+                yield '],"next":{}}}'.format(_dumps(last.identifier))
+                return
+            data = item.serialize()
+            yield ('' if i == 0 else ',') + \
+                _dumps({f: data[f] for f in fields})
+            last = item
+        yield '],"next":null}'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/json')
+
+
+@bp.route('/applications')
+@login_required
+@read_required
+def applications():
+    fields = _selected_fields(APPLICATION_FIELDS)
+    _, query = page_filters()
+    items = iter_applications(after=request.args.get('after') or None,
+                              **query)
+    return _stream('applications', items, fields)
+
+
+@bp.route('/applications/<string:app_name>/events')
+@login_required
+@read_required
+def application_events(app_name):
+    app = find_application(app_name)
+    if not app:
+        abort(404)
+
+    fields = _selected_fields(EVENT_FIELDS)
+    items = iter_application_events(app,
+                                    after=request.args.get('after') or None)
+    return _stream('events', items, fields)
@@ -1,3 +1,6 @@
+import time
+import hashlib
+import arrow
 from flask import (
     Blueprint,
     render_template,
@@ -5,6 +8,8 @@ from flask import (
     request,
     url_for,
     current_app,
+    jsonify,
+    abort,
 )
 from flask_login import (
     login_required,
@@ -16,13 +21,18 @@ from ..decorators import (
     write_required,
     permission_required,
     ssl_required,
+    etag_cached,
+    deadline,
 )
 from ..db import (
     get_application_event_data,
+    get_application_page,
+    catalog_version,
     add_application,
     add_event,
     get_events,
     get_applications,
+    find_application,
     generate_secure_token,
 )
 from ..models import (
@@ -30,18 +40,109 @@ from ..models import (
     Event,
 )
 from ..errors import SSBaseError
-from .forms import AppNameForm, EventForm
+from .forms import AppNameForm, EventForm, check_name_availability
 
 PREFIX = 'applications'
 bp = Blueprint(PREFIX, __name__, url_prefix='/%s' % PREFIX)
 
+PAGE_FILTERS = ('prefix', 'created_by', 'created_from', 'created_to')
+
+
+def _millis(value, end_of_day=False):
+    """
+    epoch milliseconds of a date filter, a plain date used as the end of
+    a range covers that whole day
+    """
+    try:
+        date = arrow.get(value)
+    except Exception:
+        abort(400)
+    if end_of_day and len(value) == len('YYYY-MM-DD'):
+        return int(date.shift(days=1).float_timestamp * 1000) - 1
+    return int(round(date.float_timestamp * 1000))
+
+
+def _catalog_etag(*args, **kwargs):
+    """
+    strong etag of a catalog page for the current user. it changes with
+    the catalog, the user's identity and permissions that are rendered
+    into the page, the requested page and, like the rendered fragments,
+    every FRAGMENT_CACHE_TTL seconds to refresh the humanized times
+    """
+    ttl = max(current_app.config['FRAGMENT_CACHE_TTL'], 1)
+    key = repr((
+        catalog_version(),
+        current_user.user_id,
+        current_user.avatar,
+        current_user.permissions,
+        [(t['id'], t['is_member']) for t in current_user.teams],
+        request.full_path,
+        int(time.time() // ttl),
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def page_limit(default, maximum):
+    """
+    the page size requested through the limit argument
+    """
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        abort(400)
+    return min(max(limit, 1), maximum)
+
+
+def page_filters():
+    """
+    the filters requested through the query arguments, as given and as
+    keyword arguments for Catalog.iter_applications
+    """
+    filters = {k: request.args[k] for k in PAGE_FILTERS
+               if request.args.get(k)}
+    created_from = filters.get('created_from')
+    created_to = filters.get('created_to')
+    query = {
+        'prefix': filters.get('prefix'),
+        'created_by': filters.get('created_by'),
+        'created_from': _millis(created_from) if created_from else None,
+        'created_to': _millis(created_to, end_of_day=True)
+        if created_to else None,
+    }
+    return filters, query
+
+
+def _paginate():
+    """
+    the page of applications selected by the request's cursor, page size
+    and filters, along with the data needed to render the pager
+    """
+    config = current_app.config
+    limit = page_limit(config['CATALOG_PAGE_SIZE'],
+                       config['CATALOG_MAX_PAGE_SIZE'])
+    filters, query = page_filters()
+    after = request.args.get('after') or None
+    apps, next_cursor = get_application_page(after=after, limit=limit,
+                                             **query)
+
+    page = {
+        'filters': filters,
+        'first_url': url_for(request.endpoint, limit=limit, **filters)
+        if after else None,
+        'next_url': url_for(request.endpoint, limit=limit, after=next_cursor,
+                            **filters)
+        if next_cursor else None,
+    }
+    return apps, page
+
 
 @bp.route('/')
 @login_required
 @read_required
+@etag_cached(_catalog_etag)
 def applications():
-    apps = get_application_event_data()
-    data = {'apps': apps}
+    apps, page = _paginate()
+    data = {'apps': apps, 'page': page}
 
     return render_template('%s/list-applications.html' % PREFIX, **data)
 
@@ -68,6 +169,7 @@ def success():
 
 
 @bp.route('/new/', methods=['GET', 'POST'])
+@deadline(12)
 @login_required
 @write_required
 def application_new():
@@ -86,6 +188,8 @@ def application_new():
             data['app'] = application
             current_app.logger.info(f'type=[new_application] app_name=[{app_name}] created_by=[{created_by}]')
         except SSBaseError:
+            # the eventcollector is the authoritative uniqueness check
+            form.app_name.errors.append('application could not be created')
             current_app.logger.exception('type=[new_application_validation_failure] app_name=[{app_name}] created_by=[{created_by}]')
         except Exception:
             current_app.logger.exception('type=[new_application_failure] app_name=[{app_name}] created_by=[{created_by}]')
@@ -94,6 +198,15 @@ def application_new():
     return render_template('%s/new-application.html' % PREFIX, **data)
 
 
+@bp.route('/availability/')
+@login_required
+@write_required
+def application_availability():
+    name = request.args.get('name', '')
+    available, message = check_name_availability(name)
+    return jsonify(name=name, available=available, message=message)
+
+
 @bp.route('/events/')
 @login_required
 @read_required
@@ -104,15 +217,17 @@ def events_all():
 @bp.route('/events/all/')
 @login_required
 @read_required
+@etag_cached(_catalog_etag)
 def events():
-    apps = get_application_event_data()
-    data = {'apps': apps}
+    apps, page = _paginate()
+    data = {'apps': apps, 'page': page}
     return render_template('%s/list-events.html' % PREFIX, **data)
 
 
 @bp.route('/<string:app_name>/events/')
 @login_required
 @read_required
+@etag_cached(_catalog_etag)
 def application_events(app_name):
     apps = get_application_event_data(app_name=app_name)
     if len(apps) == 0:
@@ -123,11 +238,12 @@ def application_events(app_name):
 
 
 @bp.route('/<string:app_name>/events/new/', methods=['GET', 'POST'])
+@deadline(12)
 @login_required
 @read_required
 def application_event_new(app_name):
     data = {}
-    app = next(get_applications(app_name=app_name), None)
+    app = find_application(app_name)
     if not app:
         # the app being requested no longer exists
         return redirect(url_for('applications.applications'))
@@ -149,9 +265,24 @@ def application_event_new(app_name):
             current_app.logger.info(f'type=[new_event] app_name=[{app.name}] event_name=[{event_name}] created_by=[{created_by}]')
             return redirect(url_for('applications.application_events', app_name=app.name))
         except SSBaseError:
+            # the eventcollector is the authoritative uniqueness check
+            form.event_name.errors.append('event could not be created')
             current_app.logger.exception('type=[new_event_validation_failure] app_name=[{app_name}] event_name=[{event_name}] created_by=[{created_by}]')
         except Exception:
             current_app.logger.exception('type=[new_event_failure] app_name=[{app_name}] event_name=[{event_name}] created_by=[{created_by}]')
 
     data['form'] = form
     return render_template('%s/new-event.html' % PREFIX, **data)
+
+
+@bp.route('/<string:app_name>/events/availability/')
+@login_required
+@read_required
+def application_event_availability(app_name):
+    app = find_application(app_name)
+    if not app:
+        return jsonify(error=f'{app_name} not found'), 404
+
+    name = request.args.get('name', '')
+    available, message = check_name_availability(name, application=app)
+    return jsonify(name=name, available=available, message=message)
@@ -1,3 +1,4 @@
+import re
 from flask import current_app
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, BooleanField, SelectField,\
@@ -5,19 +6,21 @@ from wtforms import StringField, TextAreaField, BooleanField, SelectField,\
 from wtforms.validators import DataRequired, Length, Email, Regexp, NoneOf
 from wtforms import ValidationError
 from ..db import (
-    get_applications,
-    get_events,
+    find_application,
+    application_has_event,
 )
 
+NAME_PATTERN = '^[a-z][a-z0-9_]{3,}$'
+NAME_MAX_LENGTH = 64
+NAME_MESSAGE = 'name must be lowercased ascii characters that start with a letter followed by letters, numbers or underscores'
+
 
 class AppNameForm(FlaskForm):
     app_name = StringField('AppName',
         validators=[
             DataRequired(),
-            Length(1, 64),
-            Regexp('^[a-z][a-z0-9_]{3,}$', 0,
-               'name must be lowercased ascii characters that start with a letter followed by letters, numbers or underscores'
-            ),
+            Length(1, NAME_MAX_LENGTH),
+            Regexp(NAME_PATTERN, 0, NAME_MESSAGE),
         ],
     )
     submit = SubmitField('Submit')
@@ -26,8 +29,8 @@ class AppNameForm(FlaskForm):
         super(AppNameForm, self).__init__(*args, **kwargs)
 
     def validate_app_name(self, field):
-        app_by_name = next(get_applications(app_name=field.data), None)
-        if app_by_name is not None:
+        # the eventcollector remains the authoritative check on create
+        if find_application(field.data) is not None:
             raise ValidationError('application name has already been taken')
 
 
@@ -38,10 +41,8 @@ class EventForm(FlaskForm):
     event_name = StringField('EventName',
         validators=[
             DataRequired(),
-            Length(1, 64),
-            Regexp('^[a-z][a-z0-9_]{3,}$', 0,
-               'name must be lowercased ascii characters that start with a letter followed by letters, numbers or underscores'
-            ),
+            Length(1, NAME_MAX_LENGTH),
+            Regexp(NAME_PATTERN, 0, NAME_MESSAGE),
         ],
     )
     submit = SubmitField('Submit')
@@ -52,10 +53,9 @@ class EventForm(FlaskForm):
     def validate(self):
         if not super(EventForm, self).validate():
             return False
-        application = next(get_applications(app_name=self.app_name.data), None)
+        application = find_application(self.app_name.data)
         if application:
-            event = next(get_events(app_name=application.name, event_name=self.event_name.data), None)
-            if not event:
+            if not application_has_event(application, self.event_name.data):
                 return True
             else:
                 self.event_name.errors.append('event name already exists')
@@ -63,3 +63,20 @@ class EventForm(FlaskForm):
         else:
             self.event_name.errors.append('the parent application does not exist')
             return False
+
+
+def check_name_availability(name, application=None):
+    """
+    checks a new application name, or a new event name of application,
+    against the naming rules and the local catalog.
+    returns an (available, message) tuple
+    """
+    if not name or len(name) > NAME_MAX_LENGTH or \
+            not re.match(NAME_PATTERN, name):
+        return False, NAME_MESSAGE
+    if application is None:
+        if find_application(name) is not None:
+            return False, 'application name has already been taken'
+    elif application_has_event(application, name):
+        return False, 'event name already exists'
+    return True, None
@@ -1,4 +1,5 @@
 import requests
+from itsdangerous import URLSafeTimedSerializer, BadData
 from flask import (
     Blueprint,
     redirect,
@@ -17,14 +18,22 @@ from flask_login import (
 )
 from ..decorators import (
     ssl_required,
+    deadline,
 )
 from ..db import (
     get_user,
-    get_user_by_login,
+    get_cached_user_by_login,
+    user_cache,
 )
+from ..models import User
+from ..errors import DeadlineExceededError, UpstreamUnavailableError
+from ..resilience import github_token
 from .. import login_manager
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+IDENTITY_CLAIM_KEY = 'identity'
+IDENTITY_CLAIM_SALT = 'identity-claim'
+
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -36,13 +45,64 @@ def unauthorized():
         return redirect(url_for('index'))
 
 
+def skips_user_loading():
+    """
+    static assets and health checks never need the authenticated user
+    """
+    return request.endpoint in app.config['USER_LOADING_EXEMPT_ENDPOINTS']
+
+
+def _claim_serializer():
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'],
+                                  salt=IDENTITY_CLAIM_SALT)
+
+
+def dump_identity_claim(user):
+    """
+    signs the user's resolved identity so it can be kept in the session
+    """
+    return _claim_serializer().dumps(user.to_claim())
+
+
+def load_identity_claim(claim, user_id):
+    """
+    rebuilds the user from a signed claim
+    returns None if the claim is invalid, expired or for another login
+    """
+    try:
+        data = _claim_serializer().loads(
+            claim, max_age=app.config['IDENTITY_CLAIM_MAX_AGE'])
+    except BadData:
+        return None
+
+    # claims issued before permissions were a bitmask are not trusted
+    if data.get('u') != user_id or 'p' not in data:
+        return None
+    return User.from_claim(data)
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return get_user_by_login(user_id)
+    if skips_user_loading():
+        return None
+
+    claim = session.get(IDENTITY_CLAIM_KEY)
+    if claim is not None:
+        user = load_identity_claim(claim, user_id)
+        if user is not None:
+            return user
+
+    # [IO] the claim is missing or has expired
+    user = get_cached_user_by_login(user_id)
+    if user is not None:
+        session[IDENTITY_CLAIM_KEY] = dump_identity_claim(user)
+    return user
 
 
 @bp.before_app_request
 def before_request():
+    if skips_user_loading():
+        return
     if current_user.is_authenticated:
         current_user.ping()
 
@@ -69,6 +129,7 @@ def login():
 
 
 @bp.route('/callback/', methods=['GET', 'POST'])
+@deadline(20)
 def callback():
     """
     request that is called from github oauth
@@ -89,11 +150,18 @@ def callback():
             'client_secret': app.config['GITHUB_CLIENT_SECRET'],
             'code': request.args['code']
         }
-        resp = requests.post(
-            app.config['TOKEN_URL'],
-            params=payload,
-            headers={'Accept': 'application/json'}
-        )
+        # the code can only be exchanged once, so this is never retried
+        try:
+            resp = github_token.call(lambda timeout: requests.post(
+                app.config['TOKEN_URL'],
+                params=payload,
+                headers={'Accept': 'application/json'},
+                timeout=timeout
+            ), operation='exchange_code')
+        except (UpstreamUnavailableError, DeadlineExceededError,
+                requests.RequestException):
+            app.logger.exception('auth failure')
+            return 'failed to authenticate', 503
         if not resp.ok:
             try:
                 resp.raise_for_status()
@@ -111,6 +179,7 @@ def callback():
                 return '', 404
 
             login_user(user, remember=False, force=True)
+            session[IDENTITY_CLAIM_KEY] = dump_identity_claim(user)
             index_url = "{}{}".format(app.config.get('BASE_URL'), url_for('index'))
 
             return redirect(index_url)
@@ -123,6 +192,8 @@ def callback():
 @bp.route('/logout/')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.user_id)
+    session.pop(IDENTITY_CLAIM_KEY, None)
     logout_user()
     flash('You have been logged out.')
     index_url = "{}{}".format(app.config.get('BASE_URL'), url_for('index'))
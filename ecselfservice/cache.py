@@ -0,0 +1,96 @@
+"""
+in process caches
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class TTLCache(object):
+    """
+    a thread safe, size bounded cache where entries expire after a ttl.
+    once the cache is full the least recently used entry is evicted
+    """
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, max_size=None, ttl=None):
+        """
+        updates the size and ttl of the cache, dropping anything
+        that no longer fits
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict()
+
+    def get(self, key, default=None):
+        """
+        returns the cached value for key or default if it is
+        missing or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        caches value under key for the configured ttl
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, key):
+        """
+        removes key from the cache, returns True if it was present
+        """
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """
+        removes every entry from the cache
+        """
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        current counters of the cache
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        while len(self._data) > max(self.max_size, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
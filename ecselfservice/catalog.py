@@ -0,0 +1,326 @@
+"""
+indexed in memory representation of the applications and their events
+"""
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from itertools import count
+from .models import (
+    Application,
+    Event,
+)
+from .errors import (
+    AppAlreadyExistsError,
+    EventParentNotFoundError,
+    EventAlreadyExists,
+    InvalidDataInstanceType,
+)
+
+
+# every catalog built within the process gets its own generation
+_generations = count(1)
+# the longest name prefix with an index of its own, longer prefixes
+# filter the index of their first NAME_PREFIX_LENGTH characters
+NAME_PREFIX_LENGTH = 3
+# unless they match at most this many applications, which are sorted
+NAME_MATCHES_SORTED = 256
+# applications are indexed by the utc day they were created on
+_DAY_MS = 24 * 60 * 60 * 1000
+
+
+def _insert_ordered(items, keys, item):
+    """
+    inserts item into items, which is kept in descending identifier
+    order, using keys (the same identifiers ascending) to find its
+    position with a binary search instead of re-sorting
+    """
+    i = bisect_right(keys, item.identifier)
+    keys.insert(i, item.identifier)
+    items.insert(len(keys) - 1 - i, item)
+
+
+def _add_indexed(index, key, item):
+    """
+    adds item to the identifier ordered (items, keys) bucket of key
+    """
+    items, keys = index.setdefault(key, ([], []))
+    _insert_ordered(items, keys, item)
+
+
+def _ordered(items):
+    """
+    an (items, keys) bucket of items, see _insert_ordered
+    """
+    items = sorted(items, key=_identifier, reverse=True)
+    return items, [item.identifier for item in reversed(items)]
+
+
+def _created_ms(item):
+    return item.created_on_ms
+
+
+def _identifier(item):
+    return item.identifier
+
+
+def _content_key(application):
+    # event identifiers are not stable across eventcollector responses
+    return (application.name, application.created_by,
+            application.created_on_ms,
+            tuple((e.name, e.created_by, e.created_on_ms)
+                  for e in application.events))
+
+
+def _iter_after(items, keys, cursor):
+    """
+    iterates the descending items, whose ascending identifiers are keys,
+    starting at the first item with an identifier lower than cursor
+    """
+    start = 0 if cursor is None else len(keys) - bisect_left(keys, cursor)
+    return (items[i] for i in range(start, len(items)))
+
+
+def _iter_buckets(buckets, cursor):
+    """
+    iterates the items of several (items, keys) buckets, see _iter_after,
+    merged into a single descending identifier order
+    """
+    if len(buckets) == 1:
+        items, keys = buckets[0]
+        return _iter_after(items, keys, cursor)
+    return merge(*(_iter_after(items, keys, cursor)
+                   for items, keys in buckets),
+                 key=_identifier, reverse=True)
+
+
+class Catalog(object):
+    """
+    applications indexed by name and identifier with the event names of
+    every application, ordered newest (highest ulid) first
+    """
+    def __init__(self, applications=None):
+        self.generation = next(_generations)
+        # bumped whenever anything is added to the catalog
+        self.revision = 0
+        self.applications = []
+        self._app_keys = []
+        self._apps_by_name = {}
+        self._apps_by_id = {}
+        # secondary indexes used to filter pages of applications, kept in
+        # identifier order like applications apart from the sorted names
+        self._apps_by_creator = {}
+        self._apps_by_prefix = {}
+        self._names = []
+        self._apps_by_day = {}
+        self._days = []
+        self._event_keys = {}
+        self._event_names = {}
+        # (generation, counter) bumped whenever an application's events
+        # change, carried over from an identical previous catalog
+        self._app_versions = {}
+        for application in applications or []:
+            self.add_application(application)
+
+    def __iter__(self):
+        return iter(self.applications)
+
+    def __len__(self):
+        return len(self.applications)
+
+    def get_application(self, app_name):
+        """
+        the application with the given name or None
+        """
+        return self._apps_by_name.get(app_name)
+
+    def get_application_by_id(self, identifier):
+        """
+        the application with the given identifier or None
+        """
+        return self._apps_by_id.get(identifier)
+
+    def version(self, app_identifier):
+        """
+        a key that changes whenever the application or its events change
+        """
+        return self._app_versions.get(app_identifier, (self.generation, 0))
+
+    def same_content(self, other):
+        """
+        if both catalogs hold the same applications and events
+        """
+        if len(self) != len(other):
+            return False
+        for application in self.applications:
+            previous = other.get_application_by_id(application.identifier)
+            if previous is None or \
+                    _content_key(previous) != _content_key(application):
+                return False
+        return True
+
+    def inherit_versions(self, previous):
+        """
+        keeps the versions of the applications that are unchanged since
+        the previous catalog so that what was cached for them stays valid
+        """
+        for application in self.applications:
+            old = previous.get_application_by_id(application.identifier)
+            if old is not None and \
+                    _content_key(old) == _content_key(application):
+                self._app_versions[application.identifier] = \
+                    previous.version(application.identifier)
+
+    def has_event(self, app_identifier, event_name):
+        """
+        if the application already has an event with the given name
+        """
+        return event_name in self._event_names.get(app_identifier, ())
+
+    def add(self, item):
+        """
+        adds an application or an event to its parent application
+        raises SSBaseDataError
+        """
+        if isinstance(item, Application):
+            self.add_application(item)
+        elif isinstance(item, Event):
+            self.add_event(item)
+        else:
+            raise InvalidDataInstanceType('attempt to add an unexpected type.'
+                                          'expects Application or Event but '
+                                          'received %s' % item.__class__)
+
+    def add_application(self, application):
+        if application.name in self._apps_by_name:
+            raise AppAlreadyExistsError('attempting to add an application '
+                                        'that already exists',
+                                        app_name=application.name)
+
+        # index the events the application already carries
+        events = sorted(application.events,
+                        key=lambda e: e.identifier, reverse=True)
+        application.add_events(events)
+        self._event_keys[application.identifier] = \
+            [e.identifier for e in reversed(events)]
+        self._event_names[application.identifier] = \
+            set(e.name for e in events)
+        self._app_versions[application.identifier] = (self.generation, 0)
+
+        _insert_ordered(self.applications, self._app_keys, application)
+        self._apps_by_name[application.name] = application
+        self._apps_by_id[application.identifier] = application
+
+        _add_indexed(self._apps_by_creator, application.created_by,
+                     application)
+        name = application.name
+        insort(self._names, name)
+        for length in range(1, min(len(name), NAME_PREFIX_LENGTH) + 1):
+            _add_indexed(self._apps_by_prefix, name[:length], application)
+        day = _created_ms(application) // _DAY_MS
+        if day not in self._apps_by_day:
+            insort(self._days, day)
+        _add_indexed(self._apps_by_day, day, application)
+        self.revision += 1
+
+    def add_event(self, event):
+        # locate the event's parent application
+        # determine if event doesnt already exist
+        # add event if found parent app and event DNE
+        parent_id, parent_name = \
+            (event.parent_app.identifier, event.parent_app.name) if \
+            event.parent_app else \
+            (event.parent_app_id, None)
+
+        # before adding, ensure the parent app exists
+        found_app = self._apps_by_id.get(parent_id)
+        if not found_app:
+            raise \
+                EventParentNotFoundError('attempt to add event to a '
+                                         'parent application that does '
+                                         'not exist',
+                                         app_name=parent_name or parent_id,
+                                         event_name=event.name)
+
+        # before adding the event, ensure it doesnt already exist
+        if self.has_event(parent_id, event.name):
+            raise EventAlreadyExists('attempt to add event '
+                                     'that already exists',
+                                     app_name=parent_name or parent_id,
+                                     event_name=event.name)
+
+        _insert_ordered(found_app.events, self._event_keys[parent_id], event)
+        self._event_names[parent_id].add(event.name)
+        _, changes = self._app_versions[parent_id]
+        self._app_versions[parent_id] = (self.generation, changes + 1)
+        self.revision += 1
+
+    def page(self, after=None, limit=50, **filters):
+        """
+        returns a page of at most limit applications, see iter_applications,
+        together with the cursor of the next page or None
+        """
+        page = []
+        for application in self.iter_applications(after=after, **filters):
+            if len(page) == limit:
+                return page, page[-1].identifier
+            page.append(application)
+        return page, None
+
+    def iter_applications(self, after=None, prefix=None, created_by=None,
+                          created_from=None, created_to=None):
+        """
+        lazily iterates the applications, newest first, that have an
+        identifier lower than the `after` cursor and match every given
+        filter. created_from and created_to are inclusive epoch milliseconds
+        """
+        # start from the smallest index, as every index is in identifier
+        # order a page only reads up to the cursor and as far as it needs
+        empty = ([], [])
+        candidates = [[(self.applications, self._app_keys)]]
+        if created_by is not None:
+            candidates.append(
+                [self._apps_by_creator.get(created_by, empty)])
+        if prefix:
+            bucket = self._apps_by_prefix.get(prefix[:NAME_PREFIX_LENGTH],
+                                              empty)
+            if len(prefix) > NAME_PREFIX_LENGTH:
+                lo = bisect_left(self._names, prefix)
+                hi = bisect_left(self._names, prefix + '\uffff')
+                if hi - lo <= NAME_MATCHES_SORTED:
+                    bucket = _ordered(self._apps_by_name[name]
+                                      for name in self._names[lo:hi])
+            candidates.append([bucket])
+        if created_from is not None or created_to is not None:
+            lo = 0 if created_from is None else \
+                bisect_left(self._days, created_from // _DAY_MS)
+            hi = len(self._days) if created_to is None else \
+                bisect_right(self._days, created_to // _DAY_MS)
+            candidates.append([self._apps_by_day[day]
+                               for day in self._days[lo:hi]] or [empty])
+        buckets = min(candidates,
+                      key=lambda c: sum(len(items) for items, _ in c))
+        source = _iter_buckets(buckets, after)
+
+        def matches_filters(application):
+            if created_by is not None and \
+                    application.created_by != created_by:
+                return False
+            if prefix and not application.name.startswith(prefix):
+                return False
+            if created_from is not None or created_to is not None:
+                created = _created_ms(application)
+                if created_from is not None and created < created_from:
+                    return False
+                if created_to is not None and created > created_to:
+                    return False
+            return True
+
+        return (a for a in source if matches_filters(a))
+
+    def iter_events(self, app_identifier, after=None):
+        """
+        lazily iterates the events of an application, newest first, that
+        have an identifier lower than the `after` cursor
+        """
+        application = self._apps_by_id[app_identifier]
+        return _iter_after(application.events,
+                           self._event_keys[app_identifier], after)
@@ -20,6 +20,71 @@ class Config:
     GRAPHQL_URL = 'https://api.github.com/graphql'
     TOKEN_URL = 'https://github.com/login/oauth/access_token'
     GH_REST_TEAMS_URL = 'https://github.com/login/oauth/access_token'
+    # seconds a resolved github identity is reused before re-querying
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', 1024))
+    # seconds the signed identity claim within the session is trusted
+    IDENTITY_CLAIM_MAX_AGE = int(os.environ.get('IDENTITY_CLAIM_MAX_AGE', 900))
+    # endpoints that never need the authenticated user
+    USER_LOADING_EXEMPT_ENDPOINTS = {
+        'static',
+        'index.health',
+        'index.metrics',
+    }
+    # record request and upstream metrics served at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    # github api timeouts
+    GITHUB_CONNECT_TIMEOUT = float(os.environ.get('GITHUB_CONNECT_TIMEOUT', 3.05))
+    GITHUB_READ_TIMEOUT = float(os.environ.get('GITHUB_READ_TIMEOUT', 10))
+    # retries of idempotent upstream calls, backoff in seconds
+    UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+    UPSTREAM_RETRY_BACKOFF = float(os.environ.get('UPSTREAM_RETRY_BACKOFF', 0.1))
+    UPSTREAM_RETRY_MAX_BACKOFF = float(os.environ.get('UPSTREAM_RETRY_MAX_BACKOFF', 2))
+    # consecutive failures that open an upstream's circuit breaker and
+    # the seconds it then fails fast
+    UPSTREAM_BREAKER_THRESHOLD = int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', 5))
+    UPSTREAM_BREAKER_RESET_TIMEOUT = float(os.environ.get('UPSTREAM_BREAKER_RESET_TIMEOUT', 30))
+    # seconds a request may take across all of its upstream calls,
+    # views can set their own with decorators.deadline. 0 disables it
+    REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', 8))
+    # seconds between refreshes of the team roster, 0 or no
+    # GITHUB_ROSTER_TOKEN disables it and every login is looked up on github
+    ROSTER_REFRESH_INTERVAL = int(os.environ.get('ROSTER_REFRESH_INTERVAL', 300))
+    # seconds the roster answers logins after its last successful refresh
+    ROSTER_MAX_AGE = int(os.environ.get('ROSTER_MAX_AGE', 900))
+    # token allowed to read the members of the teams
+    GITHUB_ROSTER_TOKEN = os.environ.get('GITHUB_ROSTER_TOKEN')
+    # pooled eventcollector client settings
+    ECMGR_POOL_SIZE = int(os.environ.get('ECMGR_POOL_SIZE', 10))
+    ECMGR_KEEP_ALIVE = os.environ.get('ECMGR_KEEP_ALIVE', 'true').lower() == 'true'
+    ECMGR_CONNECT_TIMEOUT = float(os.environ.get('ECMGR_CONNECT_TIMEOUT', 3.05))
+    ECMGR_READ_TIMEOUT = float(os.environ.get('ECMGR_READ_TIMEOUT', 5))
+    # max concurrent per application event requests
+    ECMGR_FETCH_CONCURRENCY = int(os.environ.get('ECMGR_FETCH_CONCURRENCY', 8))
+    # seconds between background refreshes of the catalog, 0 disables
+    CATALOG_REFRESH_INTERVAL = int(os.environ.get('CATALOG_REFRESH_INTERVAL', 60))
+    # keep an avro snapshot of the catalog in the instance path
+    CATALOG_SNAPSHOT = os.environ.get('CATALOG_SNAPSHOT', 'true').lower() == 'true'
+    # fetch the catalog once per host and hand it to the other worker
+    # processes as a snapshot, each worker still decodes its own copy
+    CATALOG_SHARED_FETCH = os.environ.get('CATALOG_SHARED_FETCH', 'false').lower() == 'true'
+    # seconds between checks for a newly published snapshot
+    CATALOG_SHARED_FETCH_POLL_INTERVAL = float(os.environ.get('CATALOG_SHARED_FETCH_POLL_INTERVAL', 1))
+    # number of applications per list page
+    CATALOG_PAGE_SIZE = int(os.environ.get('CATALOG_PAGE_SIZE', 50))
+    CATALOG_MAX_PAGE_SIZE = int(os.environ.get('CATALOG_MAX_PAGE_SIZE', 200))
+    # number of items per json api page
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+    # rendered application panels, the ttl bounds how stale
+    # their humanized times can get
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60))
+    FRAGMENT_CACHE_MAX_SIZE = int(os.environ.get('FRAGMENT_CACHE_MAX_SIZE', 2048))
+    # gevent server, see serve
+    SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.environ.get('SERVER_PORT', 5000))
+    # max requests served at once by a single process
+    SERVER_CONCURRENCY = int(os.environ.get('SERVER_CONCURRENCY', 1000))
     # EVENTCOLLECTOR_SECRET = os.environ.get('EVENTCOLLECTOR_SECRET')
     # EVENTCOLLECTOR_URL = os.environ.get('EVENTCOLLECTOR_URL')
     # GITHUB_CLIENT_ID = ''
@@ -2,38 +2,96 @@ from flask import (
     app,
     current_app,
 )
+import os
+import time
+import atexit
 import ulid
 import json
 import requests
-from threading import Lock
+from requests.adapters import HTTPAdapter
+from threading import Lock, Thread, Event as ThreadEvent
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from gevent import monkey
+from gevent.lock import BoundedSemaphore
 from .models import (
     Permission,
     User,
+    permission_mask,
     Application,
     Event,
+    decode_millis_many,
 )
-from .signer import sign
+from .signer import Signer
+from .config import Config
+from .cache import TTLCache
+from .roster import TeamRoster
+from .resilience import (
+    Upstream,
+    bounded_by,
+    collector,
+    current_deadline,
+    github_graphql,
+    without_deadline,
+)
+from .catalog import Catalog
+from .snapshot import (
+    snapshot_path,
+    read_snapshot,
+    write_snapshot,
+)
+from .shared import SharedSnapshot
 from .errors import (
     SSBaseDataError,
-    AppAlreadyExistsError,
-    EventParentNotFoundError,
-    EventAlreadyExists,
-    InvalidDataInstanceType,
+    DeadlineExceededError,
     map_error,
 )
 
 
+# responses of an eventcollector without the bulk catalog endpoint
+CATALOG_UNSUPPORTED_CODES = {
+    requests.codes.not_found,
+    requests.codes.method_not_allowed,
+    requests.codes.not_implemented,
+}
+
+
+def new_lock():
+    """
+    a greenlet-safe lock when the standard library has been patched
+    by gevent, see serve, otherwise a thread lock
+    """
+    if monkey.is_module_patched('threading'):
+        return BoundedSemaphore()
+    return Lock()
+
+
 class ECMGRClient(object):
 
     def __init__(self, app_secret, base_url, conn_timeout=3.05,
-                 read_timeout=5):
+                 read_timeout=5, pool_size=10, keep_alive=True,
+                 upstream=None):
 
         self.secret = app_secret
+        self.signer = Signer(app_secret)
         # removes trailing slash from base url if it exists
         self._base_url = base_url.rstrip('//')
-        self._conn_timeout = conn_timeout
-        self._read_timeout = read_timeout
+        # timeouts, retries and circuit breaker of every call
+        self._upstream = upstream if upstream is not None else \
+            Upstream('collector', conn_timeout, read_timeout)
         self._session = requests.Session()
+        # the session is shared by every request thread so the pool
+        # must hold a connection per concurrent caller
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        if not keep_alive:
+            self._session.headers['Connection'] = 'close'
+        # unknown until the bulk catalog endpoint has been called once
+        self.catalog_supported = None
+        # url -> (etag, last modified, decoded body) of the last response
+        self._validators = {}
 
     def get_app(self, app_name):
         pass
@@ -44,19 +102,19 @@ class ECMGRClient(object):
 
         payload = json.dumps({'createdBy': app.created_by})
 
-        sig = sign("POST", url_path, payload, [], self.secret)
+        sig = self.signer.sign("POST", url_path, payload)
 
         headers = {
             'Authorization': 'Bearer {sig}'.format(sig=sig),
             'Content-Type': 'application/json'
         }
 
-        res = self._session.post(
+        res = self._upstream.call(lambda timeout: self._session.post(
             url,
             headers=headers,
             data=payload,
-            timeout=(self._conn_timeout, self._read_timeout)
-        )
+            timeout=timeout
+        ), operation='create_app')
 
         if res.status_code == requests.codes.ok:
             response = res.json()
@@ -78,19 +136,19 @@ class ECMGRClient(object):
 
         payload = json.dumps({'createdBy': event.created_by})
 
-        sig = sign("POST", url_path, payload, [], self.secret)
+        sig = self.signer.sign("POST", url_path, payload)
 
         headers = {
             'Authorization': 'Bearer {sig}'.format(sig=sig),
             'Content-Type': 'application/json'
         }
 
-        res = self._session.post(
+        res = self._upstream.call(lambda timeout: self._session.post(
             url,
             headers=headers,
             data=payload,
-            timeout=(self._conn_timeout, self._read_timeout)
-        )
+            timeout=timeout
+        ), operation='create_event')
 
         if res.status_code == requests.codes.ok:
             response = res.json()
@@ -114,75 +172,166 @@ class ECMGRClient(object):
     def get_events(self, app):
         app_name = app.name if hasattr(app, 'name') else app['name'] if 'name' in app else app
         url_path = 'v1/a/apps/{}/events'.format(app_name)
-        url = '/'.join([self._base_url, url_path])
-        payload = b''
-
-        sig = sign("GET", url_path, payload, [],
-                   self.secret)
-
-        headers = {
-            'Authorization': 'Bearer {sig}'.format(sig=sig),
-            'Content-Type': 'application/json'
-        }
-
-        res = self._session.get(
-            url,
-            headers=headers,
-            timeout=(self._conn_timeout, self._read_timeout)
-        )
-
-        if res.status_code == requests.codes.ok:
-            response = res.json()
-            for event in response['events']:
-                # TODO: change when event generates ulid ID
-                ulid_str = ulid.new().str
-                yield Event(
-                    ulid_str,
-                    event['name'],
-                    event['createdBy'],
-                    event['createdOn'],
-                    response['app']['id']
-                )
-        else:
-            # raises error
-            self._handle_api_error(res)
-            return []
+        for event in self._conditional_get(url_path, self._parse_events,
+                                           operation='get_events'):
+            yield event
 
     def get_event(self, app_name, event_name):
         pass
 
     def get_apps(self):
         url_path = 'v1/a/apps'
+        for app in self._conditional_get(url_path, self._parse_apps,
+                                         operation='get_apps'):
+            yield app
+
+    def get_catalog(self, concurrency=1):
+        '''
+        returns every application with its events attached.
+        uses the bulk catalog endpoint when the eventcollector supports it
+        and falls back to one get_events call per application otherwise.
+        raises the first error of the fallback rather than returning a
+        catalog missing some applications' events
+        '''
+        if self.catalog_supported is not False:
+            apps = self._conditional_get(
+                'v1/a/catalog', self._parse_catalog,
+                missing_codes=CATALOG_UNSUPPORTED_CODES,
+                operation='get_catalog')
+            if apps is not None:
+                self.catalog_supported = True
+                return list(apps)
+            self.catalog_supported = False
+
+        apps = list(self.get_apps())
+        results = fetch_all_events(self, apps, concurrency)
+        errors = [(app, error) for app, (_, error) in zip(apps, results)
+                  if error is not None]
+        for app, error in errors:
+            current_app.logger.error(
+                'type=[get_events_failure] app_name=[{}] error=[{!r}]'
+                .format(app.name, error))
+        if errors:
+            # the refresh keeps serving the previous snapshot instead
+            raise errors[0][1]
+        for app, (events, _) in zip(apps, results):
+            app.add_events([e.set_parent(app) for e in events])
+        return apps
+
+    def _conditional_get(self, url_path, parse, missing_codes=(),
+                         operation='get'):
+        '''
+        signed GET that remembers the ETag/Last-Modified validators of
+        every url. when the eventcollector answers 304 the body of the
+        previous response is parsed again, the models built from it may
+        already belong to a live catalog so they are never handed out
+        twice. returns None if the response status is one of missing_codes
+        '''
         url = '/'.join([self._base_url, url_path])
         payload = b''
 
-        sig = sign("GET", url_path, payload, [],
-                          self.secret)
+        # the validators are headers, so they are not part of the signature
+        sig = self.signer.sign("GET", url_path, payload)
 
         headers = {
             'Authorization': 'Bearer {sig}'.format(sig=sig),
             'Content-Type': 'application/json'
         }
 
-        res = self._session.get(
+        cached = self._validators.get(url)
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        res = self._upstream.call(lambda timeout: self._session.get(
             url,
             headers=headers,
-            timeout=(self._conn_timeout, self._read_timeout)
-        )
-
-        if res.status_code == requests.codes.ok:
-            result = res.json()
-            for app in result:
-                yield Application(
-                    app['id'],
-                    app['name'],
-                    app['createdBy'],
-                    app['createdOn']
-                )
+            timeout=timeout
+        ), idempotent=True, operation=operation)
+
+        if res.status_code == requests.codes.not_modified and \
+                cached is not None:
+            return parse(cached[2])
+        elif res.status_code == requests.codes.ok:
+            body = res.json()
+            result = parse(body)
+            etag = res.headers.get('ETag')
+            last_modified = res.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._validators[url] = (etag, last_modified, body)
+            else:
+                self._validators.pop(url, None)
+            return result
+        elif res.status_code in missing_codes:
+            return None
         else:
             # raises error
             self._handle_api_error(res)
-            return []
+
+    @staticmethod
+    def _parse_apps(result):
+        created = decode_millis_many(app['createdOn'] for app in result)
+        return [
+            Application(
+                app['id'],
+                app['name'],
+                app['createdBy'],
+                created_on
+            )
+            for app, created_on in zip(result, created)
+        ]
+
+    @staticmethod
+    def _parse_events(response):
+        events = []
+        created = decode_millis_many(event['createdOn']
+                                     for event in response['events'])
+        for event, created_on in zip(response['events'], created):
+            # TODO: change when event generates ulid ID
+            ulid_str = ulid.new().str
+            events.append(Event(
+                ulid_str,
+                event['name'],
+                event['createdBy'],
+                created_on,
+                response['app']['id']
+            ))
+        return events
+
+    @staticmethod
+    def _parse_catalog(result):
+        apps = []
+        # decode every timestamp of the response in one pass
+        created = iter(decode_millis_many(
+            created_on
+            for app in result['apps']
+            for created_on in chain((app['createdOn'],),
+                                    (e['createdOn'] for e in app['events']))
+        ))
+        for app in result['apps']:
+            application = Application(
+                app['id'],
+                app['name'],
+                app['createdBy'],
+                next(created)
+            )
+            events = []
+            for event in app['events']:
+                # TODO: change when event generates ulid ID
+                ulid_str = ulid.new().str
+                events.append(Event(
+                    ulid_str,
+                    event['name'],
+                    event['createdBy'],
+                    next(created),
+                    application.identifier
+                ).set_parent(application))
+            application.add_events(events)
+            apps.append(application)
+        return apps
 
     @classmethod
     def _handle_api_error(cls, res):
@@ -199,11 +348,69 @@ class ECMGRClient(object):
             self._session.close()
 
 
+class _ECMGRState(object):
+    """
+    the long lived client of a single application
+    """
+    def __init__(self, app):
+        self.app = app
+        self.client = None
+        self.pid = None
+        self.lock = new_lock()
+
+    def get_client(self):
+        # clients are never shared with forked worker processes
+        if self.client is None or self.pid != os.getpid():
+            with self.lock:
+                if self.client is None or self.pid != os.getpid():
+                    config = self.app.config
+                    self.client = ECMGRClient(
+                        app_secret=config['EVENTCOLLECTOR_SECRET'],
+                        base_url=config['EVENTCOLLECTOR_URL'],
+                        conn_timeout=config['ECMGR_CONNECT_TIMEOUT'],
+                        read_timeout=config['ECMGR_READ_TIMEOUT'],
+                        pool_size=config['ECMGR_POOL_SIZE'],
+                        keep_alive=config['ECMGR_KEEP_ALIVE'],
+                        upstream=collector,
+                    )
+                    self.pid = os.getpid()
+        return self.client
+
+    def close(self):
+        with self.lock:
+            if self.client is not None and self.pid == os.getpid():
+                self.client.close()
+            self.client = None
+            self.pid = None
+
+
+class ECMGR(object):
+    """
+    flask extension that owns one pooled ECMGRClient per process
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        state = _ECMGRState(app)
+        app.extensions['ecmgr'] = state
+        # the pooled connections are closed when the process exits
+        atexit.register(state.close)
+
+    @property
+    def client(self):
+        return current_app.extensions['ecmgr'].get_client()
+
+    def close(self):
+        current_app.extensions['ecmgr'].close()
+
+
+ecmgr = ECMGR()
+
+
 def ecmgr_client():
-    return ECMGRClient(
-        app_secret=current_app.config['EVENTCOLLECTOR_SECRET'],
-        base_url=current_app.config['EVENTCOLLECTOR_URL'],
-    )
+    return ecmgr.client
 
 
 def generate_secure_token(num_bytes=32):
@@ -212,7 +419,8 @@ def generate_secure_token(num_bytes=32):
     return b64encode(token_bytes(num_bytes)).decode()
 
 
-def run_graphql_query(query, access_token=None, **kwargs):
+def run_graphql_query(query, access_token=None, operation='query',
+                      **kwargs):
     """
     A simple function to use requests.post to make the API call.
     Note the json= section.
@@ -223,12 +431,14 @@ def run_graphql_query(query, access_token=None, **kwargs):
         headers["Authorization"] = "token {}".format(access_token)
         auth = (None, access_token)
 
-    resp = requests.post(
+    # graphql queries never change anything so they are retried
+    resp = github_graphql.call(lambda timeout: requests.post(
         current_app.config['GRAPHQL_URL'],
         json={'query': query, **kwargs},
         headers=headers,
-        auth=auth
-    )
+        auth=auth,
+        timeout=timeout
+    ), idempotent=True, operation=operation)
     if resp.ok:
         return resp.json()
     else:
@@ -236,43 +446,34 @@ def run_graphql_query(query, access_token=None, **kwargs):
                         .format(resp.status_code))
 
 
-def _github_self_query(access_token):
-    """
-    github self query to git login name and avatar
-    TODO: fix support for read:org to return if user is part of
-          required org
-    """
-    graphql_query = """
+SELF_QUERY = """
     query {
       self: viewer {
         login
-        avatar: avatarUrl(size: 30)
-        #query($required_org: String!) {
-        #org: organization(login: $required_org){
-        #  login
-        #}
       }
     }
     """
-    variables = {
-        # 'required_org': ORG
+
+TEAM_MEMBERSHIP_FRAGMENT = """
+    fragment teamMembership on Team {
+      team_name: name
+      team_slug: slug
+      team_memberships: members(first: 100, query: $user) {
+        members: edges {
+          member_role: role
+          member: node {
+            login
+          }
+        }
+      }
     }
-    data = run_graphql_query(graphql_query, access_token, variables=variables)
-    return data['data']['self']
+    """
 
 
-def _github_user_teams_query(user_login):
+def _user_memberships_query(teams):
     """
-    returns the following structure
-    case class Member(login: String, name: String)
-    case class Members(member_role: String, member_url: String, member: Member)
-    case class TeamMemberships(total: Int, members: List[Members])
-    case class TeamMembership(team_name: String, team_slug: String,
-                              team_description: Option[String],
-                              team_memberships: TeamMemberships)
-    case class UserMemberships(login: String, teams: Map[String,
-                               Option[TeamMembership]])
-    case class QueryResult(user_memberships: UserMemberships)
+    the user's avatar together with, for every team, only the team
+    members matching the user's login
     """
     def subteam_query(team):
         """
@@ -282,10 +483,7 @@ def _github_user_teams_query(user_login):
             "{team_alias}: team(slug: \"{team_name}\") {{ ...teamMembership }}"\
             .format(team_alias=team.replace("-", "_"), team_name=team)
 
-    subteam_queries = list(subteam_query(team) for team in
-                           current_app.config['EVENTCOLLECTOR_TEAMS'])
-    user_teams = "\n".join(subteam_queries)
-
+    user_teams = "\n".join(subteam_query(team) for team in sorted(teams))
     query = """
         query ($org: String!, $user: String!) {
           user_memberships: user(login: $user) {
@@ -296,56 +494,121 @@ def _github_user_teams_query(user_login):
           }
         }
         """ % user_teams
+    return query + TEAM_MEMBERSHIP_FRAGMENT
 
-    fragments = """
-        fragment teamMembership on Team {
-          team_name: name
-          team_slug: slug
-          team_description: description
-          team_memberships: members(first: 100, query: $user){
-            total: totalCount
-            members: edges{
-              member_role: role
-              member_url: memberAccessUrl
-              member: node {
-                login
-                name
-              }
-            }
-          }
-        }
-        """
-    graphql_query = query + fragments
+
+# built once, teams are not expected to change at runtime
+USER_MEMBERSHIPS_QUERY = _user_memberships_query(Config.EVENTCOLLECTOR_TEAMS)
+
+
+def _github_self_query(access_token):
+    """
+    github self query to get the login name
+    TODO: fix support for read:org to return if user is part of
+          required org
+    """
+    data = run_graphql_query(SELF_QUERY, access_token, operation='viewer',
+                             variables={})
+    return data['data']['self']
+
+
+def _github_user_teams_query(user_login):
+    """
+    returns the following structure
+    case class Member(login: String)
+    case class Members(member_role: String, member: Member)
+    case class TeamMemberships(members: List[Members])
+    case class TeamMembership(team_name: String, team_slug: String,
+                              team_memberships: TeamMemberships)
+    case class UserMemberships(avatar: String, teams: Map[String,
+                               Option[TeamMembership]])
+    case class QueryResult(user_memberships: UserMemberships)
+    """
+    teams = current_app.config['EVENTCOLLECTOR_TEAMS']
+    graphql_query = USER_MEMBERSHIPS_QUERY \
+        if teams == Config.EVENTCOLLECTOR_TEAMS \
+        else _user_memberships_query(teams)
     variables = {
         'org': current_app.config['ORG'],
         'user': user_login,
     }
-    data = run_graphql_query(graphql_query, None, variables=variables)
+    data = run_graphql_query(graphql_query, None,
+                             operation='user_memberships',
+                             variables=variables)
     return data['data']['user_memberships']
 
 
-def determine_user_memberships(login, data):
-    def has_login(m):
-        return m['member']['login'] == login
-
-    def filter_non_empty(f):
-        return len(list(f)) > 0
-
+def determine_user_memberships(login, data=None):
+    if data is None:
+        # answered from the team roster
+        yield from roster.memberships(login)
+        return
     for key, value in (data['teams'] or {}).items():
+        # github already narrowed the members down to the login but
+        # its search also matches names, so the login is still compared
+        members = value['team_memberships']['members']
         yield {
             'name': value['team_name'],
             'id': value['team_slug'],
-            'is_member':
-                value['team_memberships']['total'] > 0 and \
-                filter_non_empty(filter(has_login,
-                                        value['team_memberships']['members']))
+            'is_member': any(m['member']['login'] == login for m in members)
+        }
+
+
+ROSTER_QUERY = """
+    query ($org: String!, $team: String!, $after: String) {
+      organization(login: $org) {
+        team(slug: $team) {
+          team_name: name
+          team_slug: slug
+          team_members: members(first: 100, after: $after) {
+            page: pageInfo {
+              has_next: hasNextPage
+              cursor: endCursor
+            }
+            members: nodes {
+              login
+              avatar: avatarUrl(size: 30)
+            }
+          }
         }
+      }
+    }
+    """
 
 
-def get_roles_for_login(user_login, memberships):
+def _github_team_members(team):
+    """
+    pages through every member of a team, returns a
+    (name, slug, {login: avatar}) tuple or None if the team does not exist
+    """
+    config = current_app.config
+    variables = {
+        'org': config['ORG'],
+        'team': team,
+        'after': None,
+    }
+    members = {}
+    while True:
+        data = run_graphql_query(ROSTER_QUERY, config['GITHUB_ROSTER_TOKEN'],
+                                 operation='team_members',
+                                 variables=variables)
+        value = data['data']['organization']['team']
+        if value is None:
+            return None
+        page = value['team_members']
+        members.update((m['login'], m['avatar']) for m in page['members'])
+        if not page['page']['has_next']:
+            return value['team_name'], value['team_slug'], members
+        variables['after'] = page['page']['cursor']
+
+
+def get_roles_for_login(user_login, memberships=None):
     """
     returns an iterator of memberships for a given login
+    answers from the team roster when no memberships are given
     """
+    if memberships is None:
+        memberships = roster.memberships(user_login)
     active_memberships = \
         list(i for i in memberships if i['is_member'] is True)
 
@@ -369,138 +632,502 @@ def get_user_by_login(user_id):
         # NOTE: for testing
         # user_id = "jkachmar"
 
+        # logins missing from the roster are looked up, they
+        # may have joined a team since it was refreshed
+        _start_roster_refresher()
+        if user_id in roster and \
+                roster.is_fresh(current_app.config['ROSTER_MAX_AGE']):
+            memberships = list(determine_user_memberships(user_id))
+            permissions = permission_mask(
+                get_roles_for_login(user_id, memberships))
+            return User(user_id=user_id, avatar=roster.avatar(user_id),
+                        roles=None, teams=memberships,
+                        permissions=permissions)
+
         user_teams = _github_user_teams_query(user_id)
         memberships = list(determine_user_memberships(user_id, user_teams))
         user_avatar = user_teams['avatar']
-        roles = list(r for r in get_roles_for_login(user_id, memberships))
-        return User(user_id=user_id, avatar=user_avatar, roles=roles, teams=memberships)
+        permissions = permission_mask(
+            get_roles_for_login(user_id, memberships))
+        return User(user_id=user_id, avatar=user_avatar, roles=None,
+                    teams=memberships, permissions=permissions)
+    except DeadlineExceededError:
+        raise
     except Exception:
         current_app.logger.exception("error getting roles for login")
         return None
 
 
+roster = TeamRoster()
+_roster_refresher = None
+
+
+class RosterRefresher(Thread):
+    """
+    daemon thread that loads the team roster right away and then
+    replaces it periodically
+    """
+    def __init__(self, app, interval):
+        super(RosterRefresher, self).__init__(name='roster-refresher')
+        self.daemon = True
+        self.app = app
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stopped = ThreadEvent()
+
+    def run(self):
+        with self.app.app_context():
+            refresh_roster()
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                refresh_roster()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def refresh_roster():
+    """
+    replaces the roster with the current members of the configured
+    teams, the previous roster is kept if github cannot be reached
+    """
+    teams = []
+    avatars = {}
+    try:
+        for team in sorted(current_app.config['EVENTCOLLECTOR_TEAMS']):
+            result = _github_team_members(team)
+            if result is None:
+                current_app.logger.error(
+                    'type=[roster_team_not_found] team=[{}]'.format(team))
+                continue
+            name, slug, members = result
+            teams.append((name, slug, members.keys()))
+            avatars.update(members)
+    except Exception:
+        current_app.logger.exception('type=[roster_refresh_failure] '
+                                     'generation=[{}]'
+                                     .format(roster.generation))
+        return False
+
+    roster.replace(teams, avatars)
+    current_app.logger.info('type=[roster_refresh] generation=[{}] '
+                            'members=[{}]'.format(roster.generation,
+                                                  len(avatars)))
+    return True
+
+
+def _start_roster_refresher():
+    global _roster_refresher
+    interval = current_app.config['ROSTER_REFRESH_INTERVAL']
+    # without a token every refresh would fail against github
+    if interval <= 0 or not current_app.config['GITHUB_ROSTER_TOKEN']:
+        return
+    # threads do not survive a fork, so each worker starts its own
+    if _roster_refresher is None or _roster_refresher.pid != os.getpid():
+        with _lock:
+            if _roster_refresher is None or \
+                    _roster_refresher.pid != os.getpid():
+                _roster_refresher = RosterRefresher(
+                    current_app._get_current_object(), interval)
+                _roster_refresher.start()
+
+
+user_cache = TTLCache()
+
+
+def get_cached_user_by_login(user_id):
+    """
+    returns the user for a login from the identity cache, only
+    querying github when the login is missing or expired
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_login(user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+    return user
+
+
 def get_user(access_token):
     try:
         # [IO] get user information from self query
         gh_user_data = _github_self_query(access_token)
         user_id = gh_user_data['login']
-        avatar = gh_user_data['avatar']
+    except DeadlineExceededError:
+        raise
     except Exception:
         current_app.logger.exception("error querying self user")
         return None
 
-    return get_user_by_login(user_id)
+    user = get_user_by_login(user_id)
+    if user is not None:
+        # a fresh login always replaces what was cached
+        user_cache.set(user_id, user)
+    return user
 
 
 _topic_data = None
+# when the current catalog snapshot was fetched from the eventcollector
+_topic_data_updated_at = None
+# items added while a refresh is running, replayed onto the new snapshot
+_pending_items = None
+_refresher = None
+# this process' handle on the snapshot shared between workers
+_shared = None
+# (added at, item) of items this process added to a shared snapshot
+_recent_items = []
+
+
+def fetch_all_events(client, apps, concurrency=None):
+    """
+    fetches the events of every application with at most `concurrency`
+    requests in flight. returns an (events, error) pair per application
+    in the same order as `apps`, where error is the exception raised
+    while fetching that application's events or None.
+    every fetch is bounded by the deadline of the current request,
+    raises DeadlineExceededError once it has passed
+    """
+    # the pool threads have no app context to find the deadline in
+    deadline = current_deadline()
+
+    def fetch(app):
+        try:
+            with bounded_by(deadline):
+                return list(client.get_events(app)), None
+        except Exception as e:
+            return [], e
+
+    if concurrency is None:
+        concurrency = current_app.config['ECMGR_FETCH_CONCURRENCY']
+    workers = min(max(concurrency, 1), len(apps))
+    if workers <= 1:
+        results = [fetch(app) for app in apps]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map keeps the results in the order of the applications
+            results = list(executor.map(fetch, apps))
+
+    for _, error in results:
+        if isinstance(error, DeadlineExceededError):
+            raise error
+    return results
 
 
 def get_applications(app_name=None):
     # apps = _get_or_update_data()
     client = ecmgr_client()
-    apps = client.get_apps()
-    for app in apps:
-        if app_name is None:
-            yield app
-            events = ecmgr_client().get_events(app)
-            for event in events:
-                yield event
-        else:
+    apps = list(client.get_apps())
+    if app_name is not None:
+        for app in apps:
             if isinstance(app, Application):
                 if app.name == app_name:
                     yield app
+        return
+
+    for app, (events, error) in zip(apps, fetch_all_events(client, apps)):
+        if error is not None:
+            current_app.logger.error(
+                'type=[get_events_failure] app_name=[{}] error=[{!r}]'
+                .format(app.name, error))
+        yield app
+        for event in events:
+            yield event
 
 
 def deserialize_apps():
-    mappings = {}
-    DATA = get_applications()
-    for e in sorted(DATA, key=lambda i: (i.type, i.id)):
-        if e.type == 'event':
-            event = Event.parse(e)
-            event.set_parent(mappings['apps'][event.parent_app_id])
-            mappings.setdefault('events', {})\
-                .setdefault(event.parent_app_id, []).append(event)
-        elif e.type == 'application':
-            application = Application.parse(e)
-            mappings.setdefault('apps', {})[application.identifier] = application
-
-    apps = mappings['apps'] if 'apps' in mappings else {}
-    for app_id, application in sorted(apps.items(), reverse=True):
-        events = mappings['events'] if 'events' in mappings else {}
-        sorted_events = sorted(events.get(app_id, []),
+    client = ecmgr_client()
+    apps = client.get_catalog(
+        concurrency=current_app.config['ECMGR_FETCH_CONCURRENCY'])
+    for application in sorted(apps, key=lambda a: a.identifier,
+                              reverse=True):
+        sorted_events = sorted(application.events,
                                key=lambda e: e.identifier, reverse=True)
         application.add_events(list(sorted_events))
         yield application
 
-_lock = Lock()
+_lock = new_lock()
+# held while a snapshot is fetched so only one fetch runs at a time
+_refresh_lock = new_lock()
 
-def _get_or_update_data(item_to_append=None):
+
+class CatalogRefresher(Thread):
+    """
+    daemon thread that periodically replaces the catalog snapshot
+    when reconcile is set the first refresh runs right away
+    """
+    def __init__(self, app, interval, reconcile=False):
+        super(CatalogRefresher, self).__init__(name='catalog-refresher')
+        self.daemon = True
+        self.app = app
+        self.interval = interval
+        self.reconcile = reconcile
+        self.pid = os.getpid()
+        self._stopped = ThreadEvent()
+
+    def run(self):
+        if self.reconcile:
+            # started while the cold load still holds _refresh_lock
+            with self.app.app_context():
+                refresh_data(force=True, wait=True)
+        if self.interval <= 0:
+            return
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                refresh_data()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _build_snapshot():
+    """
+    fetches a new catalog and swaps it in as the current snapshot
+    must be called while holding _refresh_lock
+    """
+    global _topic_data, _topic_data_updated_at, _pending_items
     with _lock:
-        # HACK: YES I KNOW! global is evil
-        global _topic_data
-        if _topic_data is None:
-            _topic_data = list(deserialize_apps())
+        _pending_items = []
+    try:
+        # [IO] readers keep using the previous snapshot meanwhile
+        catalog = Catalog(deserialize_apps())
+        with _lock:
+            for item in _pending_items:
+                try:
+                    catalog.add(item)
+                except SSBaseDataError:
+                    # already part of the refreshed catalog
+                    pass
+            previous = _topic_data
+            unchanged = previous is not None and \
+                catalog.same_content(previous)
+            if unchanged:
+                # keeps the generation, and with it every cached
+                # fragment and etag, when nothing has changed
+                catalog = previous
+            else:
+                if previous is not None:
+                    catalog.inherit_versions(previous)
+                _topic_data = catalog
+            _topic_data_updated_at = time.time()
+    finally:
+        with _lock:
+            _pending_items = None
+
+    if not unchanged:
+        _save_snapshot_file(catalog)
+    shared = _shared_snapshot()
+    # a process that just became the publisher publishes at least once
+    if not unchanged or (shared is not None and
+                         shared.loaded_generation == 0):
+        _publish_shared(catalog)
+
+
+def _shared_snapshot():
+    """
+    this process' handle on the shared snapshot, None unless
+    CATALOG_SHARED_FETCH
+    """
+    global _shared
+    if not current_app.config['CATALOG_SHARED_FETCH']:
+        return None
+    with _lock:
+        if _shared is None or _shared.pid != os.getpid():
+            _shared = SharedSnapshot(current_app.instance_path)
+        return _shared
+
+
+def _publish_shared(catalog):
+    shared = _shared_snapshot()
+    if shared is None or not shared.is_publisher:
+        return
+    try:
+        generation = shared.publish(catalog.applications)
+        # a worker that took over as publisher no longer needs what it
+        # kept while waiting for another publisher to catch up
+        with _lock:
+            del _recent_items[:]
+        current_app.logger.info(
+            'type=[catalog_published] generation=[{}]'.format(generation))
+    except Exception:
+        current_app.logger.exception(
+            'type=[catalog_publish_failure] path=[{}]'.format(shared.path))
+
 
+def _load_shared_snapshot(shared):
+    """
+    replaces the catalog with the one published by another process.
+    returns True if a published catalog was loaded
+    """
+    global _topic_data, _topic_data_updated_at
+    snapshot = shared.load()
+    if snapshot is None:
+        return False
+
+    generation, created_at, applications = snapshot
+    catalog = Catalog(applications)
+    with _lock:
+        # keep what this process added until the publisher has caught up
+        _recent_items[:] = [(added_at, item) for added_at, item
+                            in _recent_items if added_at >= created_at]
+        for _, item in _recent_items:
+            try:
+                catalog.add(item)
+            except SSBaseDataError:
+                pass
+        if _topic_data is None or not catalog.same_content(_topic_data):
+            if _topic_data is not None:
+                catalog.inherit_versions(_topic_data)
+            _topic_data = catalog
+        _topic_data_updated_at = created_at
+    return True
+
+
+def _load_snapshot_file():
+    """
+    serves the avro snapshot of a previous run until the eventcollector
+    has been reconciled. returns True if a snapshot was loaded
+    must be called while holding _refresh_lock
+    """
+    global _topic_data, _topic_data_updated_at
+    if not current_app.config['CATALOG_SNAPSHOT']:
+        return False
+    path = snapshot_path(current_app)
+    try:
+        snapshot = read_snapshot(path)
+    except Exception:
+        current_app.logger.exception(
+            'type=[catalog_snapshot_read_failure] path=[{}]'.format(path))
+        return False
+    if snapshot is None:
+        return False
+
+    created_at, applications = snapshot
+    catalog = Catalog(applications)
+    with _lock:
+        _topic_data = catalog
+        _topic_data_updated_at = created_at
+    return True
+
+
+def _save_snapshot_file(catalog):
+    if not current_app.config['CATALOG_SNAPSHOT']:
+        return
+    path = snapshot_path(current_app)
+    try:
+        write_snapshot(path, catalog.applications)
+    except Exception:
+        current_app.logger.exception(
+            'type=[catalog_snapshot_write_failure] path=[{}]'.format(path))
+
+
+def _start_refresher(reconcile=False):
+    global _refresher
+    interval = current_app.config['CATALOG_REFRESH_INTERVAL']
+    if _shared_snapshot() is not None:
+        # workers poll the generation of the shared snapshot
+        interval = current_app.config['CATALOG_SHARED_FETCH_POLL_INTERVAL']
+    if interval <= 0 and not reconcile:
+        return
+    # threads do not survive a fork, so each worker starts its own
+    if _refresher is None or _refresher.pid != os.getpid():
+        _refresher = CatalogRefresher(current_app._get_current_object(),
+                                      interval, reconcile)
+        _refresher.start()
+
+
+def refresh_data(force=False, wait=False):
+    """
+    replaces the catalog snapshot with the eventcollector's current state.
+    if the eventcollector fails the last good snapshot keeps being served.
+    when the fetch is shared between workers only the publisher calls
+    the eventcollector, everyone else loads newly published generations.
+    unless wait is set nothing is done while another refresh is running.
+    returns True if the snapshot was replaced
+    """
+    if not _refresh_lock.acquire(blocking=wait):
+        # another refresh is already running
+        return False
+    try:
+        shared = _shared_snapshot()
+        if shared is not None:
+            if not shared.acquire_publisher():
+                return shared.is_stale() and _load_shared_snapshot(shared)
+
+            # the publisher polls as often as the workers do
+            interval = current_app.config['CATALOG_REFRESH_INTERVAL']
+            age = catalog_age()
+            if not force and age is not None and \
+                    (interval <= 0 or age < interval):
+                return False
+
+        _build_snapshot()
+        return True
+    except Exception:
+        current_app.logger.exception(
+            'type=[catalog_refresh_failure] snapshot_age=[{}]'
+            .format(catalog_age()))
+        return False
+    finally:
+        _refresh_lock.release()
+
+
+def catalog_age():
+    """
+    seconds since the catalog snapshot was fetched, None if never loaded
+    """
+    updated_at = _topic_data_updated_at
+    if updated_at is None:
+        return None
+    return time.time() - updated_at
+
+
+def _load_initial_data():
+    """
+    fills the empty catalog of this process
+    must be called while holding _refresh_lock
+    """
+    shared = _shared_snapshot()
+    if shared is not None and not shared.acquire_publisher() and \
+            _load_shared_snapshot(shared):
+        _start_refresher()
+        return
+
+    # a snapshot from disk is reconciled in the background
+    reconcile = _load_snapshot_file()
+    if not reconcile:
+        _build_snapshot()
+    _start_refresher(reconcile)
+
+
+def _get_or_update_data(item_to_append=None):
+    if _topic_data is None:
+        with _refresh_lock:
+            if _topic_data is None:
+                # the first catalog may take longer than a page is given,
+                # cutting it short would leave every request without one
+                with without_deadline():
+                    _load_initial_data()
+
+    with _lock:
         if item_to_append is not None:
             # throws exception
             _append_application_data(item_to_append, _topic_data)
-            _topic_data.sort(key=lambda e: e.identifier, reverse=True)
+            if _pending_items is not None:
+                _pending_items.append(item_to_append)
+            # the publisher's own additions are part of what it publishes
+            if _shared is not None and not _shared.is_publisher:
+                _recent_items.append((time.time(), item_to_append))
 
         return _topic_data
 
 
 def _append_application_data(item, data):
+    """
+    adds an application or an event to the catalog `data`
+    the catalog keeps itself ordered, so no re-sort is needed
+    """
     try:
-        if isinstance(item, Application):
-            def _find_app_by_name(a):
-                return a.name == item.name
-
-            # search the instances to see if the app name already exists
-            found_app = next(filter(_find_app_by_name, data), None)
-            if found_app:
-                raise AppAlreadyExistsError('attempting to add an application '
-                                            'that already exists',
-                                            app_name=item.name)
-            data.append(item)
-        elif isinstance(item, Event):
-            # locate the event's parent application
-            # determine if event doesnt already exist
-            # add event if found parent app and event DNE
-            parent_id, parent_name = \
-                (item.parent_app.identifier, item.parent_app.name) if \
-                item.parent_app else \
-                (item.parent_app_id, None)
-
-            def _find_app_by_identifier(a):
-                return a.identifier == parent_id
-
-            def _find_event_by_name(e):
-                return e.name == item.name
-
-            # before adding, ensure the parent app exists
-            found_app = next(filter(_find_app_by_identifier, data), None)
-            if not found_app:
-                raise \
-                    EventParentNotFoundError('attempt to add event to a '
-                                             'parent application that does '
-                                             'not exist',
-                                             app_name=parent_name or parent_id,
-                                             event_name=item.name)
-
-            # before adding the event, ensure it doesnt already exist
-            event = next(filter(_find_event_by_name, found_app.events), None)
-            if event:
-                raise EventAlreadyExists('attempt to add event '
-                                         'that already exists',
-                                         app_name=parent_name or parent_id,
-                                         event_name=item.name)
-            # append the event
-            found_app.events.append(item)
-            found_app.events.sort(key=lambda k: k.identifier, reverse=True)
-        else:
-            raise InvalidDataInstanceType('attempt to add an unexpected type.'
-                                          'expects Application or Event but '
-                                          'received %s' % item.__class__)
+        data.add(item)
     except SSBaseDataError:
         raise
     except Exception:
@@ -541,11 +1168,70 @@ def get_events(app_name=None, event_name=None):
 
 
 def get_application_event_data(app_name=None):
-    apps = _get_or_update_data()
+    catalog = _get_or_update_data()
     if app_name is None:
-        return apps
+        return catalog.applications
+
+    application = catalog.get_application(app_name)
+    return [application] if application is not None else []
+
+
+def get_application_page(after=None, limit=50, prefix=None,
+                         created_by=None, created_from=None,
+                         created_to=None):
+    """
+    a page of applications from the local catalog and the cursor of
+    the next page, see Catalog.page
+    """
+    return _get_or_update_data().page(after=after, limit=limit,
+                                      prefix=prefix, created_by=created_by,
+                                      created_from=created_from,
+                                      created_to=created_to)
+
+
+def iter_applications(**filters):
+    """
+    lazily iterates the applications of the local catalog,
+    see Catalog.iter_applications
+    """
+    return _get_or_update_data().iter_applications(**filters)
+
+
+def iter_application_events(application, after=None):
+    """
+    lazily iterates the events of an application of the local catalog,
+    see Catalog.iter_events
+    """
+    return _get_or_update_data().iter_events(application.identifier,
+                                             after=after)
 
-    def filter_by_app_name(application):
-        return application.name == app_name
 
-    return list(filter(filter_by_app_name, apps))
+def catalog_version():
+    """
+    a key that changes whenever anything within the local catalog changes
+    """
+    catalog = _get_or_update_data()
+    return catalog.generation, catalog.revision
+
+
+def application_version(application):
+    """
+    a key that changes whenever the application or its events change
+    within the local catalog
+    """
+    return _get_or_update_data().version(application.identifier)
+
+
+def find_application(app_name):
+    """
+    the application with the given name from the local catalog or None
+    """
+    return _get_or_update_data().get_application(app_name)
+
+
+def application_has_event(application, event_name):
+    """
+    if the local catalog has an event with the given name for application
+    """
+    return _get_or_update_data().has_event(application.identifier,
+                                           event_name)
@@ -1,7 +1,7 @@
 from functools import wraps
-from flask import abort, current_app, redirect, request
+from flask import abort, current_app, redirect, request, make_response
 from flask_login import current_user
-from .models import Permission
+from .models import Permission, permission_mask
 
 
 def ssl_required(fn):
@@ -18,11 +18,51 @@ def ssl_required(fn):
     return decorated_view
 
 
-def permission_required(permission):
+def etag_cached(etag_fn):
+    """
+    answers If-None-Match with a 304 before the view renders anything
+    when the strong etag computed by etag_fn matches
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not current_user.can(permission):
+            etag = etag_fn(*args, **kwargs)
+            if etag in request.if_none_match:
+                rv = make_response('', 304)
+            else:
+                rv = make_response(f(*args, **kwargs))
+                if rv.status_code != 200:
+                    return rv
+            rv.set_etag(etag)
+            # browsers must always revalidate the page
+            rv.cache_control.private = True
+            rv.cache_control.no_cache = True
+            return rv
+        return decorated_function
+    return decorator
+
+
+def deadline(seconds):
+    """
+    the budget in seconds of every upstream call made while handling
+    the view's requests, see resilience.start_deadline
+    """
+    def decorator(f):
+        f.deadline = seconds
+        return f
+    return decorator
+
+
+def permission_required(*permissions):
+    """
+    requires every given permission, combined once into a single mask
+    """
+    mask = permission_mask(permissions)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.can(mask):
                 return current_app.login_manager.unauthorized()
                 # abort(403)
             return f(*args, **kwargs)
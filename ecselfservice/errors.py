@@ -122,6 +122,28 @@ class SchemaEvolutionError(SSBaseError):
                     errors=', '.join(self.errors))
 
 
+class UpstreamUnavailableError(SSBaseError):
+    '''
+    Error indicates the circuit breaker of an upstream is open
+    and the call was not made
+    '''
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.message = 'upstream {} is unavailable'.format(upstream)
+        super(UpstreamUnavailableError, self).__init__(self.message)
+
+
+class DeadlineExceededError(SSBaseError):
+    '''
+    Error indicates the request ran out of time before or while
+    calling an upstream
+    '''
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.message = 'ran out of time calling {}'.format(upstream)
+        super(DeadlineExceededError, self).__init__(self.message)
+
+
 def map_error(resp):
     '''
     Error mapper that maps error based on attributes
@@ -0,0 +1,34 @@
+"""
+cache of rendered template fragments
+"""
+from flask import current_app
+from flask_login import current_user
+from jinja2 import Markup
+from .cache import TTLCache
+from .db import application_version
+
+# the ttl bounds how stale the humanized times of a fragment can get
+fragment_cache = TTLCache()
+
+
+def cached_fragment(template_name, application):
+    """
+    renders the template for an application, reusing the html rendered
+    for the same version of the application and the same write access
+    """
+    can_write = current_user.has_write_access()
+    key = (template_name, application.identifier,
+           application_version(application), can_write)
+    html = fragment_cache.get(key)
+    if html is None:
+        template = current_app.jinja_env.get_template(template_name)
+        html = Markup(template.render(app=application,
+                                      current_user=current_user))
+        fragment_cache.set(key, html)
+    return html
+
+
+def init_app(app):
+    fragment_cache.configure(max_size=app.config['FRAGMENT_CACHE_MAX_SIZE'],
+                             ttl=app.config['FRAGMENT_CACHE_TTL'])
+    app.add_template_global(cached_fragment)
@@ -6,11 +6,19 @@ from flask import (
     render_template,
     request,
     session,
-    url_for
+    url_for,
+    jsonify,
+    abort,
+    current_app,
+    Response,
 )
 from ..decorators import (
     ssl_required,
 )
+from ..db import catalog_age, user_cache, roster
+from ..fragments import fragment_cache
+from ..resilience import upstream_stats
+from ..metrics import registry, CONTENT_TYPE
 bp = Blueprint('index', __name__)
 
 
@@ -24,3 +32,21 @@ def index():
 def unauthorized():
     data = {}
     return render_template('unauthorized.html', **data)
+
+
+@bp.route('/health/')
+def health():
+    caches = {
+        'users': user_cache.stats(),
+        'fragments': fragment_cache.stats(),
+    }
+    return jsonify(status='ok', catalog_age=catalog_age(),
+                   roster=roster.stats(), upstreams=upstream_stats(),
+                   caches=caches), 200
+
+
+@bp.route('/metrics')
+def metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(registry.render(), content_type=CONTENT_TYPE)
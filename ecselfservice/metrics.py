@@ -0,0 +1,244 @@
+"""
+in process metrics served in the prometheus text format at /metrics.
+recording is a dictionary lookup and a few additions under a lock so
+it stays on in production. every worker process keeps its own numbers
+"""
+import time
+from bisect import bisect_left
+from threading import Lock
+from flask import g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# seconds, covers page renders as well as slow upstream calls
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n')\
+        .replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(n, _escape(v))
+                          for n, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation),
+                 '# TYPE {} {}'.format(self.name, self.type)]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels, value):
+        return ['{}{} {}'.format(self.name,
+                                 _labels(self.labelnames, labels),
+                                 _number(value))]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        # only the bucket the value falls into is counted,
+        # they are accumulated when rendered
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = \
+                    [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def _samples(self, labels, value):
+        with self._lock:
+            counts, total = list(value[0]), value[1]
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append('{}_bucket{} {}'.format(
+                self.name,
+                _labels(self.labelnames, labels, [('le', _number(bound))]),
+                cumulative))
+        label_str = _labels(self.labelnames, labels)
+        lines.append('{}_sum{} {}'.format(self.name, label_str,
+                                          _number(total)))
+        lines.append('{}_count{} {}'.format(self.name, label_str,
+                                            cumulative))
+        return lines
+
+
+class Registry(object):
+    """
+    the metrics of the process together with collectors, functions
+    returning (name, type, documentation, [(labels, value)]) tuples
+    for numbers that are already kept elsewhere
+    """
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, type_, documentation, samples in collect():
+                lines.append('# HELP {} {}'.format(name, documentation))
+                lines.append('# TYPE {} {}'.format(name, type_))
+                for labels, value in samples:
+                    lines.append('{}{} {}'.format(
+                        name, _labels([n for n, _ in labels],
+                                      [v for _, v in labels]),
+                        _number(value)))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    'ecselfservice_request_duration_seconds',
+    'time spent handling requests',
+    ('endpoint', 'method', 'status')))
+requests_in_flight = registry.register(Gauge(
+    'ecselfservice_requests_in_flight',
+    'requests currently being handled',
+    ('endpoint',)))
+upstream_duration = registry.register(Histogram(
+    'ecselfservice_upstream_request_duration_seconds',
+    'time spent on each attempt of a call to an upstream',
+    ('upstream', 'operation', 'outcome')))
+
+
+@registry.collector
+def _collect_caches():
+    from .db import user_cache
+    from .fragments import fragment_cache
+    caches = (('users', user_cache.stats()),
+              ('fragments', fragment_cache.stats()))
+    for key, type_, documentation in (
+            ('hits', 'counter', 'cache lookups that found a value'),
+            ('misses', 'counter', 'cache lookups that found nothing'),
+            ('evictions', 'counter', 'values evicted from a full cache'),
+            ('size', 'gauge', 'values within the cache')):
+        name = 'ecselfservice_cache_{}{}'.format(
+            key, '_total' if type_ == 'counter' else '')
+        yield name, type_, documentation, \
+            [((('cache', cache),), stats[key]) for cache, stats in caches]
+
+
+# circuit breaker states as numbers
+BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+@registry.collector
+def _collect_upstreams():
+    from .resilience import upstream_stats
+    stats = sorted(upstream_stats().items())
+    yield 'ecselfservice_upstream_breaker_state', 'gauge', \
+        'circuit breaker state, 0 closed, 1 half open, 2 open', \
+        [((('upstream', name),), BREAKER_STATES[s['state']])
+         for name, s in stats]
+    yield 'ecselfservice_upstream_rejected_total', 'counter', \
+        'calls rejected by an open circuit breaker', \
+        [((('upstream', name),), s['rejected']) for name, s in stats]
+
+
+@registry.collector
+def _collect_catalog():
+    from .db import catalog_age
+    age = catalog_age()
+    yield 'ecselfservice_catalog_age_seconds', 'gauge', \
+        'seconds since the catalog was fetched from the eventcollector', \
+        [] if age is None else [((), age)]
+
+
+def observe_upstream(upstream, operation, started, outcome):
+    upstream_duration.observe((upstream, operation, outcome),
+                              time.perf_counter() - started)
+
+
+def _before_request():
+    endpoint = request.endpoint or 'none'
+    g.metrics_request = (endpoint, time.perf_counter())
+    requests_in_flight.inc((endpoint,))
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _teardown_request(error=None):
+    started = g.pop('metrics_request', None)
+    if started is None:
+        return
+    endpoint, started_at = started
+    status = g.pop('metrics_status', 500)
+    requests_in_flight.dec((endpoint,))
+    request_duration.observe((endpoint, request.method, str(status)),
+                             time.perf_counter() - started_at)
+
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
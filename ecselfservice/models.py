@@ -3,10 +3,11 @@ from flask_login import UserMixin, AnonymousUserMixin
 import arrow
 import ulid
 from arrow.parser import ParserError
-from datetime import datetime
+from datetime import datetime, timezone
 from . import login_manager
 import random
 import string
+import sys
 
 
 def gen_state():
@@ -21,26 +22,47 @@ class Permission:
     ADMIN = 8
 
 
+def permission_mask(permissions):
+    """
+    combines permissions into a single bitmask
+    """
+    mask = 0
+    for permission in permissions:
+        mask |= permission
+    return mask
+
+
+def _permission_list(mask):
+    return [1 << bit for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+
 class User(UserMixin):
     """
     information regarding the authenticated user
     """
-    def __init__(self, user_id, avatar, roles, teams):
+    def __init__(self, user_id, avatar, roles, teams, permissions=None):
         self.id = user_id
         self.user_id = self.id
         self.avatar = avatar
-        self.roles = roles or []
+        # every permission of the user within a single bitmask
+        self.permissions = permissions if permissions is not None \
+            else permission_mask(roles or [])
         self.teams = teams or []
         self.last_seen = datetime.utcnow()
 
+    @property
+    def roles(self):
+        """
+        the user's permissions as a list
+        """
+        return _permission_list(self.permissions)
+
     def can(self, perm):
         """
-        if the user has a specific permission
+        if the user has a specific permission, or every
+        permission of a combined mask
         """
-        for role in self.roles:
-            if role == perm:
-                return True
-        return False
+        return self.permissions & perm == perm
 
     def is_administrator(self):
         """
@@ -66,11 +88,36 @@ class User(UserMixin):
         """
         self.last_seen = datetime.utcnow()
 
+    def to_claim(self):
+        """
+        compact representation of the user's identity
+        that can be stored within the session
+        """
+        return {
+            'u': self.user_id,
+            'a': self.avatar,
+            'p': self.permissions,
+            't': [[t['name'], t['id'], 1 if t['is_member'] else 0]
+                  for t in self.teams],
+        }
+
+    @staticmethod
+    def from_claim(claim):
+        """
+        rebuilds a user from the result of to_claim
+        """
+        teams = [{'name': name, 'id': slug, 'is_member': is_member == 1}
+                 for name, slug, is_member in claim['t']]
+        return User(user_id=claim['u'], avatar=claim['a'], roles=None,
+                    teams=teams, permissions=claim['p'])
+
 
 class AnonymousUser(AnonymousUserMixin):
     """
     if a user hasnt logged in yet they are considered "anonymouse"
     """
+    permissions = 0
+
     def __init__(self):
         self.user_id = "anonymous"
         self.state = gen_state()
@@ -104,32 +151,92 @@ class AnonymousUser(AnonymousUserMixin):
 login_manager.anonymous_user = AnonymousUser
 
 
-def get_date(millis):
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _datetime_millis(date):
+    # naive datetimes are utc, as returned by datetime.utcnow
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    delta = date - _EPOCH
+    # rounds sub millisecond values the way serialize always has
+    seconds = delta.days * 86400 + delta.seconds
+    return int(round((seconds + delta.microseconds / 1000000) * 1000))
+
+
+def _parse_date(value):
     try:
-        date = arrow.get(millis)
+        return arrow.get(value)
     except ParserError:
         app.logger.exception("error parsing datetime value=[{}]"
-                             .format(millis))
+                             .format(value))
         raise
-    except ValueError:
-        # if attempting to parse a long fails, then it will
-        # fall back to attempt to extract the milliseconds
-        sec, ms = divmod(millis, 1000)
-        # since the values are millisecond truncated
-        # pad the right of the value with 6 zeros
-        date = \
-            arrow.get(sec).replace(microseconds=int('{:<06d}'.format(ms)))
-    return date
+
+
+def decode_millis(value):
+    """
+    epoch milliseconds of an eventcollector timestamp (epoch milliseconds),
+    an iso 8601 string, a datetime or an arrow date. floats are epoch
+    seconds, as arrow.get has always read them
+    """
+    # eventcollector and snapshot timestamps, by far the most common
+    if type(value) is int:
+        return value
+    if isinstance(value, arrow.Arrow):
+        return _datetime_millis(value.datetime)
+    if isinstance(value, datetime):
+        return _datetime_millis(value)
+    if isinstance(value, float):
+        return int(round(value * 1000))
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return _datetime_millis(_parse_date(value).datetime)
+
+
+def decode_millis_many(values):
+    """
+    decodes a whole sequence of timestamps at once, see decode_millis
+    """
+    values = list(values)
+    if all(type(v) is int for v in values):
+        return values
+    return [decode_millis(v) for v in values]
+
+
+def get_date(millis):
+    """
+    utc arrow date of a value accepted by decode_millis
+    """
+    if isinstance(millis, arrow.Arrow):
+        return millis
+    return from_millis(decode_millis(millis))
+
+
+def from_millis(millis):
+    """
+    utc arrow date of epoch milliseconds
+    """
+    sec, ms = divmod(millis, 1000)
+    return arrow.Arrow.utcfromtimestamp(sec).replace(microsecond=ms * 1000)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class Application(object):
     """
     The top level application/service that describes an event stream
     """
+    __slots__ = ('identifier', 'name', 'created_by', 'created_on_ms',
+                 '_created_on', 'events')
+    type = 'application'
+
     def __init__(self, identifier, name, created_by, created_on):
         if created_on is None:
             created_on = arrow.utcnow()
-        self.created_on = get_date(created_on)
+        self.created_on_ms = decode_millis(created_on)
+        self._created_on = None
 
         if identifier is None:
             self.identifier = \
@@ -137,11 +244,23 @@ class Application(object):
         else:
             self.identifier = identifier
 
-        self.id = self.identifier
         self.name = name
-        self.created_by = created_by
+        # the same few creators are repeated across the whole catalog
+        self.created_by = _intern(created_by)
         self.events = []
-        self.type = 'application'
+
+    @property
+    def id(self):
+        return self.identifier
+
+    @property
+    def created_on(self):
+        """
+        creation date, only built when it is accessed
+        """
+        if self._created_on is None:
+            self._created_on = from_millis(self.created_on_ms)
+        return self._created_on
 
     def add_events(self, events):
         """
@@ -152,8 +271,8 @@ class Application(object):
     @staticmethod
     def parse(data):
         """
-        parses application data from dictionary object
-        TODO will be replaced by avro parser
+        parses application data from a dictionary object
+        or an avro snapshot record
         """
         if isinstance(data, Application):
             return data
@@ -171,7 +290,7 @@ class Application(object):
             'type': 'application',
             'name': self.name,
             'created_by': self.created_by,
-            'created_on': int(round(self.created_on.float_timestamp * 1000)),
+            'created_on': self.created_on_ms,
         }
 
 
@@ -179,11 +298,16 @@ class Event(object):
     """
     An event that belongs to an application
     """
+    __slots__ = ('identifier', 'name', 'created_by', 'created_on_ms',
+                 '_created_on', 'parent_app_id', 'parent_app')
+    type = 'event'
+
     def __init__(self, identifier, name, created_by, created_on,
                  parent_app_id):
         if created_on is None:
             created_on = arrow.utcnow()
-        self.created_on = get_date(created_on)
+        self.created_on_ms = decode_millis(created_on)
+        self._created_on = None
 
         if identifier is None:
             self.identifier = \
@@ -191,12 +315,23 @@ class Event(object):
         else:
             self.identifier = identifier
 
-        self.id = self.identifier
         self.name = name
-        self.created_by = created_by
+        self.created_by = _intern(created_by)
         self.parent_app_id = parent_app_id
         self.parent_app = None
-        self.type = 'event'
+
+    @property
+    def id(self):
+        return self.identifier
+
+    @property
+    def created_on(self):
+        """
+        creation date, only built when it is accessed
+        """
+        if self._created_on is None:
+            self._created_on = from_millis(self.created_on_ms)
+        return self._created_on
 
     def set_parent(self, parent_application):
         """
@@ -209,8 +344,8 @@ class Event(object):
     @staticmethod
     def parse(data):
         """
-        parses event data from dictionary object
-        TODO will be replaced by avro parser
+        parses event data from a dictionary object
+        or an avro snapshot record
         """
         if isinstance(data, Event):
             return data
@@ -230,5 +365,5 @@ class Event(object):
             'parent_id': self.parent_app.identifier if self.parent_app is not None else self.parent_app_id,
             'name': self.name,
             'created_by': self.created_by,
-            'created_on': int(round(self.created_on.float_timestamp * 1000)),
+            'created_on': self.created_on_ms,
         }
@@ -0,0 +1,308 @@
+"""
+timeouts, retries and circuit breakers of the calls made to github
+and the eventcollector, so that a slow or failing upstream cannot
+tie up every worker. within a request every call is also bounded by
+what is left of the request's deadline
+"""
+import time
+import random
+from contextlib import contextmanager
+from threading import Lock, local
+import requests
+from flask import current_app, g, has_app_context, request
+from .errors import DeadlineExceededError, UpstreamUnavailableError
+from .metrics import observe_upstream
+
+# responses worth another attempt of an idempotent call
+RETRY_STATUS_CODES = {
+    requests.codes.bad_gateway,
+    requests.codes.service_unavailable,
+    requests.codes.gateway_timeout,
+}
+
+
+class CircuitBreaker(object):
+    """
+    opens after failure_threshold consecutive failures and then rejects
+    every call for reset_timeout seconds. afterwards a single trial call
+    is let through, closing the breaker again if it succeeds
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._lock = Lock()
+
+    def allow(self):
+        """
+        if a call may be made right now
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and \
+                    time.monotonic() - self.opened_at >= self.reset_timeout:
+                # let a single trial call through
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def abandon(self):
+        """
+        gives up a call that says nothing about the upstream, a trial
+        call of a half open breaker is allowed again right away
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or \
+                    self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(self.reset_timeout -
+                               (time.monotonic() - self.opened_at), 0)
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'retry_in': retry_in,
+            }
+
+
+class Upstream(object):
+    """
+    an upstream service with its own timeouts, retry policy
+    and circuit breaker
+    """
+    def __init__(self, name, connect_timeout=3.05, read_timeout=5,
+                 retries=2, backoff=0.1, max_backoff=2,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def configure(self, connect_timeout=None, read_timeout=None,
+                  retries=None, backoff=None, max_backoff=None,
+                  failure_threshold=None, reset_timeout=None):
+        if connect_timeout is not None:
+            self.timeout = (connect_timeout, self.timeout[1])
+        if read_timeout is not None:
+            self.timeout = (self.timeout[0], read_timeout)
+        if retries is not None:
+            self.retries = retries
+        if backoff is not None:
+            self.backoff = backoff
+        if max_backoff is not None:
+            self.max_backoff = max_backoff
+        if failure_threshold is not None:
+            self.breaker.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.breaker.reset_timeout = reset_timeout
+
+    def _delay(self, attempt):
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    def _budgeted_timeout(self):
+        """
+        the timeout of the next call, cut down to what is left of the
+        request's deadline. returns a (timeout, limited) tuple
+        """
+        budget = remaining_budget()
+        if budget is None or budget >= max(self.timeout):
+            return self.timeout, False
+        if budget <= 0:
+            raise DeadlineExceededError(self.name)
+        return tuple(min(t, budget) for t in self.timeout), True
+
+    def call(self, send, idempotent=False, operation='call'):
+        """
+        returns the response of send(timeout). connection errors,
+        timeouts and 5xx responses count as failures of the upstream,
+        idempotent calls are retried after them. every attempt is
+        timed under the given operation name.
+        raises UpstreamUnavailableError while the breaker is open and
+        DeadlineExceededError once the request's deadline has passed
+        """
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            last = attempt + 1 == attempts
+            timeout, limited = self._budgeted_timeout()
+            if not self.breaker.allow():
+                raise UpstreamUnavailableError(self.name)
+            started = time.perf_counter()
+            try:
+                res = send(timeout)
+            except requests.Timeout as e:
+                observe_upstream(self.name, operation, started, 'timeout')
+                if limited:
+                    # the request ran out of time, not the upstream
+                    self.breaker.abandon()
+                    raise DeadlineExceededError(self.name) from e
+                self.breaker.record_failure()
+                if last:
+                    raise
+            except requests.ConnectionError:
+                observe_upstream(self.name, operation, started,
+                                 'connection_error')
+                self.breaker.record_failure()
+                if last:
+                    raise
+            except BaseException:
+                # also gevent.Timeout and GreenletExit, a half open breaker
+                # would otherwise never let another trial call through
+                observe_upstream(self.name, operation, started, 'exception')
+                self.breaker.abandon()
+                raise
+            else:
+                if res.status_code < 500:
+                    observe_upstream(self.name, operation, started, 'ok')
+                    self.breaker.record_success()
+                    return res
+                observe_upstream(self.name, operation, started, 'error')
+                self.breaker.record_failure()
+                if last or res.status_code not in RETRY_STATUS_CODES:
+                    return res
+            delay = self._delay(attempt)
+            budget = remaining_budget()
+            if budget is not None and budget <= delay:
+                raise DeadlineExceededError(self.name)
+            time.sleep(delay)
+
+    def stats(self):
+        stats = self.breaker.stats()
+        stats['timeout'] = list(self.timeout)
+        return stats
+
+
+github_graphql = Upstream('github_graphql')
+github_token = Upstream('github_token')
+collector = Upstream('collector')
+
+upstreams = {u.name: u for u in (github_graphql, github_token, collector)}
+
+
+def start_deadline():
+    """
+    starts the deadline of a request, the view's own budget in seconds,
+    see decorators.deadline, or REQUEST_DEADLINE. 0 disables it
+    """
+    view = current_app.view_functions.get(request.endpoint)
+    seconds = getattr(view, 'deadline', None)
+    if seconds is None:
+        seconds = current_app.config['REQUEST_DEADLINE']
+    g.deadline = time.monotonic() + seconds if seconds > 0 else None
+
+
+# deadline of a worker thread working for a request, see bounded_by
+_worker = local()
+
+
+def current_deadline():
+    """
+    monotonic deadline of the current request, or of the request a
+    worker thread works for. None without a deadline
+    """
+    if has_app_context() and 'deadline' in g:
+        return g.deadline
+    return getattr(_worker, 'deadline', None)
+
+
+@contextmanager
+def bounded_by(deadline):
+    """
+    bounds the upstream calls of a thread without an app context, such
+    as a pool thread, by the deadline of the request it works for
+    """
+    previous = getattr(_worker, 'deadline', None)
+    _worker.deadline = deadline
+    try:
+        yield
+    finally:
+        _worker.deadline = previous
+
+
+@contextmanager
+def without_deadline():
+    """
+    lifts the deadline of the current request, for work that has to
+    finish even if the request that happens to run it is in a hurry
+    """
+    if not has_app_context() or 'deadline' not in g:
+        yield
+        return
+    deadline = g.deadline
+    g.deadline = None
+    try:
+        yield
+    finally:
+        g.deadline = deadline
+
+
+def remaining_budget():
+    """
+    seconds left until the deadline of the current request,
+    None outside of a request or without a deadline
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_exceeded(error):
+    current_app.logger.warning('type=[deadline_exceeded] endpoint=[{}] '
+                               'upstream=[{}]'
+                               .format(request.endpoint, error.upstream))
+    return 'the request took too long', 503
+
+
+def upstream_stats():
+    return {name: u.stats() for name, u in upstreams.items()}
+
+
+def init_app(app):
+    config = app.config
+    policy = {
+        'retries': config['UPSTREAM_RETRIES'],
+        'backoff': config['UPSTREAM_RETRY_BACKOFF'],
+        'max_backoff': config['UPSTREAM_RETRY_MAX_BACKOFF'],
+        'failure_threshold': config['UPSTREAM_BREAKER_THRESHOLD'],
+        'reset_timeout': config['UPSTREAM_BREAKER_RESET_TIMEOUT'],
+    }
+    for upstream in (github_graphql, github_token):
+        upstream.configure(connect_timeout=config['GITHUB_CONNECT_TIMEOUT'],
+                           read_timeout=config['GITHUB_READ_TIMEOUT'],
+                           **policy)
+    collector.configure(connect_timeout=config['ECMGR_CONNECT_TIMEOUT'],
+                        read_timeout=config['ECMGR_READ_TIMEOUT'],
+                        **policy)
+    app.before_request(start_deadline)
+    app.register_error_handler(DeadlineExceededError, deadline_exceeded)
@@ -0,0 +1,64 @@
+"""
+members of the eventcollector teams, kept in memory so that the
+teams of a login are resolved without querying github
+"""
+import time
+
+
+class TeamRoster(object):
+    """
+    the members of every team, replaced as a whole on every refresh
+    """
+    def __init__(self):
+        self.generation = 0
+        self.updated_at = None
+        # ((name, slug, logins), ...), {login: avatar}
+        self._state = ((), {})
+
+    def replace(self, teams, avatars):
+        """
+        swaps in the (name, slug, logins) of every team together
+        with the avatar of every member
+        """
+        self._state = (
+            tuple((name, slug, frozenset(logins))
+                  for name, slug, logins in teams),
+            dict(avatars),
+        )
+        self.generation += 1
+        self.updated_at = time.time()
+
+    def age(self):
+        """
+        seconds since the roster was replaced, None if never loaded
+        """
+        updated_at = self.updated_at
+        if updated_at is None:
+            return None
+        return time.time() - updated_at
+
+    def is_fresh(self, max_age):
+        age = self.age()
+        return age is not None and age <= max_age
+
+    def __contains__(self, login):
+        return login in self._state[1]
+
+    def avatar(self, login):
+        return self._state[1].get(login)
+
+    def memberships(self, login):
+        """
+        the teams of a login, as returned by determine_user_memberships
+        """
+        teams, _ = self._state
+        return [{'name': name, 'id': slug, 'is_member': login in logins}
+                for name, slug, logins in teams]
+
+    def stats(self):
+        teams, _ = self._state
+        return {
+            'generation': self.generation,
+            'age': self.age(),
+            'teams': {slug: len(logins) for _, slug, logins in teams},
+        }
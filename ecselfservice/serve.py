@@ -0,0 +1,34 @@
+"""
+production server, serves the application on gevent's wsgi server so
+that every request waiting on github or the eventcollector only holds
+a greenlet. the standard library has to be patched before anything
+else is imported, so it is started through gevent's launcher:
+
+    python -m gevent.monkey --module ecselfservice.serve
+"""
+from gevent import monkey
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from . import create_app
+
+
+def main():
+    if not monkey.is_module_patched('socket'):
+        raise SystemExit('the standard library is not patched, start the '
+                         'server with: python -m gevent.monkey '
+                         '--module ecselfservice.serve')
+
+    app = create_app()
+    config = app.config
+    address = (config['SERVER_HOST'], config['SERVER_PORT'])
+    # bounds the number of requests handled at once
+    pool = Pool(config['SERVER_CONCURRENCY'])
+    server = WSGIServer(address, app, spawn=pool)
+    app.logger.info('type=[server_start] address=[{}:{}] concurrency=[{}]'
+                    .format(address[0], address[1],
+                            config['SERVER_CONCURRENCY']))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
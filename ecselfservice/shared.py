@@ -0,0 +1,119 @@
+"""
+catalog fetch shared by every worker process of a host.
+
+one process, the publisher, holds an exclusive lock on the instance
+path, fetches the catalog from the eventcollector and writes it as an
+uncompressed avro snapshot. after every write it increments a
+generation counter kept in a small memory-mapped file. every other
+process reads the snapshot again only once the generation has changed.
+
+only the fetch is shared, every worker decodes the snapshot into its
+own Catalog
+"""
+import os
+import mmap
+import fcntl
+import struct
+from threading import Lock
+from .snapshot import (
+    SNAPSHOT_FORMAT_VERSION,
+    read_snapshot,
+    write_snapshot,
+)
+
+SHARED_FILENAME = 'catalog.v{}.shared.avro'.format(SNAPSHOT_FORMAT_VERSION)
+GENERATION_FILENAME = 'catalog.v{}.generation'.format(SNAPSHOT_FORMAT_VERSION)
+LOCK_FILENAME = 'catalog.v{}.lock'.format(SNAPSHOT_FORMAT_VERSION)
+
+_GENERATION = struct.Struct('<Q')
+
+
+class SharedSnapshot(object):
+    """
+    a process' handle on the shared snapshot of an instance path
+    """
+    def __init__(self, instance_path):
+        self.path = os.path.join(instance_path, SHARED_FILENAME)
+        self._generation_path = os.path.join(instance_path,
+                                             GENERATION_FILENAME)
+        self._lock_path = os.path.join(instance_path, LOCK_FILENAME)
+        self._lock_fd = None
+        self._generation_map = None
+        # generation of the snapshot this process has loaded
+        self.loaded_generation = 0
+        self._mutex = Lock()
+        self.pid = os.getpid()
+
+    @property
+    def is_publisher(self):
+        return self._lock_fd is not None
+
+    def acquire_publisher(self):
+        """
+        attempts to become the publisher, the lock is held until the
+        process exits. returns True if this process is the publisher
+        """
+        with self._mutex:
+            if self._lock_fd is not None:
+                return True
+            fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            return True
+
+    def _map_generation(self):
+        if self._generation_map is None:
+            fd = os.open(self._generation_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < _GENERATION.size:
+                    os.ftruncate(fd, _GENERATION.size)
+                self._generation_map = mmap.mmap(fd, _GENERATION.size)
+            finally:
+                os.close(fd)
+        return self._generation_map
+
+    def generation(self):
+        """
+        the generation last published by any process, 0 if none
+        """
+        return _GENERATION.unpack_from(self._map_generation())[0]
+
+    def publish(self, applications):
+        """
+        writes the applications as the new shared snapshot
+        only the publisher may call this
+        """
+        if not self.is_publisher:
+            raise RuntimeError('only the publisher can publish the catalog')
+        # every worker decodes it, which is cheaper without compression
+        write_snapshot(self.path, applications, codec='null')
+        generation = self.generation() + 1
+        _GENERATION.pack_into(self._map_generation(), 0, generation)
+        self.loaded_generation = generation
+        return generation
+
+    def load(self):
+        """
+        decodes the published snapshot.
+        returns a (generation, created_at, applications) tuple or None
+        if nothing has been published yet
+        """
+        generation = self.generation()
+        if generation == 0:
+            return None
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            return None
+        self.loaded_generation = generation
+        created_at, applications = snapshot
+        return generation, created_at, applications
+
+    def is_stale(self):
+        """
+        if another generation has been published since the last load
+        """
+        return self.generation() != self.loaded_generation
@@ -4,6 +4,8 @@ import hmac
 import six
 
 ON_NEW_LINE = '\n'
+# bytes read at once when hashing a file like payload
+CHUNK_SIZE = 64 * 1024
 
 
 def sign(method, url, payload, items, app_secret):
@@ -39,3 +41,54 @@ def compute_signature(items, app_secret, encoded_req_str):
     sig = hmac.new(b64decode(app_secret),
                    utf8(req_str_with_app_name), hashlib.sha256).digest()
     return b64encode(sig).decode()
+
+
+def _chunks(payload):
+    if isinstance(payload, six.text_type):
+        return (payload.encode('utf-8'),)
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return (payload,)
+    if hasattr(payload, 'read'):
+        return iter(lambda: payload.read(CHUNK_SIZE), b'')
+    return (utf8(chunk) for chunk in payload)
+
+
+class Signer(object):
+    """
+    signs eventcollector requests like sign, the secret is only decoded
+    and keyed into an hmac once and then copied for every request
+    """
+    def __init__(self, app_secret):
+        self._hmac = hmac.new(b64decode(app_secret), digestmod=hashlib.sha256)
+
+    def sign(self, method, url, payload, items=None):
+        encoded_payload = self.hash_payload(payload)
+        encoded_req_str = hash_and_b64encode(build_req_str(method, url,
+                                                           encoded_payload))
+        return self.compute_signature(items, encoded_req_str)
+
+    def sign_many(self, requests, items=None):
+        """
+        signs a sequence of (method, url, payload) requests
+        """
+        return [self.sign(method, url, payload, items)
+                for method, url, payload in requests]
+
+    @staticmethod
+    def hash_payload(payload):
+        """
+        hashes a str, a bytes like object, a binary file like object or
+        an iterable of chunks incrementally, see hash_and_b64encode
+        """
+        digest = hashlib.sha256()
+        for chunk in _chunks(payload):
+            digest.update(chunk)
+        return b64encode(digest.digest())
+
+    def compute_signature(self, items, encoded_req_str):
+        mac = self._hmac.copy()
+        for item in items or []:
+            mac.update(utf8(item))
+            mac.update(b'\n')
+        mac.update(encoded_req_str)
+        return b64encode(mac.digest()).decode()
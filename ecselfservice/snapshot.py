@@ -0,0 +1,109 @@
+"""
+avro snapshot of the application catalog kept in the instance path so
+that a new worker can serve pages before the eventcollector answers
+"""
+import os
+import time
+import fastavro
+from .models import (
+    Application,
+    Event,
+)
+
+# version of the file layout, part of the file name
+SNAPSHOT_FORMAT_VERSION = 1
+# version of the record schema, stored within the file metadata
+SNAPSHOT_SCHEMA_VERSION = 1
+
+SNAPSHOT_FILENAME = 'catalog.v{}.avro'.format(SNAPSHOT_FORMAT_VERSION)
+META_SCHEMA_VERSION = 'ecselfservice.schema.version'
+META_CREATED_AT = 'ecselfservice.created_at'
+
+SNAPSHOT_SCHEMA = {
+    'type': 'record',
+    'name': 'Application',
+    'namespace': 'ecselfservice.snapshot.v{}'.format(SNAPSHOT_SCHEMA_VERSION),
+    'fields': [
+        {'name': 'id', 'type': 'string'},
+        {'name': 'name', 'type': 'string'},
+        {'name': 'created_by', 'type': ['null', 'string']},
+        {'name': 'created_on', 'type': 'long'},
+        {'name': 'events', 'type': {
+            'type': 'array',
+            'items': {
+                'type': 'record',
+                'name': 'Event',
+                'fields': [
+                    {'name': 'id', 'type': 'string'},
+                    {'name': 'parent_id', 'type': 'string'},
+                    {'name': 'name', 'type': 'string'},
+                    {'name': 'created_by', 'type': ['null', 'string']},
+                    {'name': 'created_on', 'type': 'long'},
+                ],
+            },
+        }},
+    ],
+}
+
+
+def snapshot_path(app):
+    """
+    location of the snapshot for a flask application
+    """
+    return os.path.join(app.instance_path, SNAPSHOT_FILENAME)
+
+
+def _to_record(application):
+    record = application.serialize()
+    record['events'] = [e.serialize() for e in application.events]
+    return record
+
+
+def _from_record(record):
+    application = Application.parse(record)
+    application.add_events([Event.parse(e).set_parent(application)
+                            for e in record['events']])
+    return application
+
+
+def write_snapshot(path, applications, codec='deflate'):
+    """
+    atomically replaces the snapshot at path with the applications
+    and their events
+    """
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    metadata = {
+        META_SCHEMA_VERSION: str(SNAPSHOT_SCHEMA_VERSION),
+        META_CREATED_AT: str(int(time.time())),
+    }
+    with open(tmp_path, 'wb') as fo:
+        fastavro.writer(fo, SNAPSHOT_SCHEMA,
+                        (_to_record(a) for a in applications),
+                        codec=codec, metadata=metadata)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """
+    returns a (created_at, applications) tuple read from the snapshot
+    at path, or None if it does not exist or has another schema version
+    """
+    try:
+        fo = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with fo:
+        return read_snapshot_from(fo)
+
+
+def read_snapshot_from(fo):
+    """
+    reads a snapshot from a file like object, see read_snapshot
+    """
+    avro_reader = fastavro.reader(fo)
+    version = avro_reader.metadata.get(META_SCHEMA_VERSION)
+    if version != str(SNAPSHOT_SCHEMA_VERSION):
+        return None
+    created_at = int(avro_reader.metadata[META_CREATED_AT])
+    return created_at, [_from_record(r) for r in avro_reader]
@@ -8,3 +8,31 @@ $(function () {
     }
   })
 })
+
+$(function () {
+  // checks name availability as the user types
+  $('[data-availability-url]').each(function() {
+    let input = $(this);
+    let group = input.closest('.form-group');
+    let timer = null;
+    let showStatus = function(available, message) {
+      group.removeClass('has-error has-success');
+      group.find('.js-availability').remove();
+      if (available === null) return;
+      group.addClass(available ? 'has-success' : 'has-error');
+      if (message) {
+        group.append($('<span class="help-block js-availability"></span>').text(message));
+      }
+    };
+    input.on('input', function() {
+      clearTimeout(timer);
+      let name = input.val();
+      if (!name) return showStatus(null);
+      timer = setTimeout(function() {
+        $.getJSON(input.data('availability-url'), {name: name}, function(data) {
+          if (input.val() === data.name) showStatus(data.available, data.message);
+        });
+      }, 250);
+    });
+  });
+})
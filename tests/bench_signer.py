@@ -0,0 +1,46 @@
+"""
+microbenchmark of request signing, the reference sign against Signer
+
+    python -m tests.bench_signer
+"""
+import io
+import timeit
+
+from ecselfservice.signer import Signer, sign
+from tests.helpers import SECRET
+
+NUMBER = 20000
+
+SMALL = '{"name": "checkout", "createdBy": "bob"}'
+LARGE = SMALL.encode('utf-8') * 25000
+
+
+def run(label, func, number=NUMBER):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('{:<32} {:>10.2f} us/request'.format(label,
+                                               seconds / number * 1e6))
+
+
+def main():
+    signer = Signer(SECRET)
+    requests = [('GET', '/applications/{}/events'.format(i), '')
+                for i in range(100)]
+
+    run('sign get', lambda: sign('GET', '/applications', '', None, SECRET))
+    run('Signer.sign get', lambda: signer.sign('GET', '/applications', ''))
+    run('sign post', lambda: sign('POST', '/applications', SMALL,
+                                  ['app'], SECRET))
+    run('Signer.sign post', lambda: signer.sign('POST', '/applications',
+                                                SMALL, ['app']))
+    run('sign 1mb post', lambda: sign('POST', '/applications', LARGE,
+                                      None, SECRET), number=200)
+    run('Signer.sign 1mb file', lambda: signer.sign(
+        'POST', '/applications', io.BytesIO(LARGE)), number=200)
+    run('sign x100', lambda: [sign(m, u, p, None, SECRET)
+                              for m, u, p in requests], number=200)
+    run('Signer.sign_many x100', lambda: signer.sign_many(requests),
+        number=200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+microbenchmark of timestamp decoding, old arrow path against decode_millis
+
+    python -m tests.bench_timestamps
+"""
+import timeit
+
+import arrow
+
+from ecselfservice.models import decode_millis, decode_millis_many, from_millis
+
+NUMBER = 20000
+
+MILLIS = [1539000000000 + i * 7919 for i in range(100)]
+ISO = [from_millis(m).isoformat() for m in MILLIS]
+
+
+def arrow_millis(value):
+    # what get_date and serialize did before decode_millis, less the right
+    # padding of the milliseconds which misread values below 100
+    try:
+        date = arrow.get(value)
+    except ValueError:
+        sec, ms = divmod(value, 1000)
+        date = arrow.get(sec).replace(microsecond=ms * 1000)
+    return int(round(date.float_timestamp * 1000))
+
+
+def run(label, func, values):
+    number = max(1, NUMBER // len(values))
+    seconds = min(timeit.repeat(lambda: func(values), number=number, repeat=3))
+    print('{:<32} {:>8.2f} us/value'.format(
+        label, seconds / (number * len(values)) * 1e6))
+
+
+def main():
+    for name, values in (('millis', MILLIS), ('iso', ISO)):
+        assert [arrow_millis(v) for v in values] == decode_millis_many(values)
+        run('arrow ' + name, lambda vs: [arrow_millis(v) for v in vs], values)
+        run('decode_millis ' + name,
+            lambda vs: [decode_millis(v) for v in vs], values)
+        run('decode_millis_many ' + name, decode_millis_many, values)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+flask application configured against stand-in upstreams
+"""
+import os
+import tempfile
+from base64 import b64encode
+from ecselfservice import create_app, db
+from ecselfservice.auth import IDENTITY_CLAIM_KEY, dump_identity_claim
+from ecselfservice.models import Permission, User
+from ecselfservice.resilience import upstreams
+
+SECRET = b64encode(b'secret').decode()
+
+
+def create_test_app(collector_url, **config):
+    app = create_app()
+    app.instance_path = tempfile.mkdtemp()
+    app.config.update(
+        TESTING=True,
+        SSL=False,
+        WTF_CSRF_ENABLED=False,
+        EVENTCOLLECTOR_SECRET=SECRET,
+        EVENTCOLLECTOR_URL=collector_url,
+        CATALOG_REFRESH_INTERVAL=0,
+        CATALOG_SNAPSHOT=False,
+        CATALOG_SHARED_FETCH=False,
+        ROSTER_REFRESH_INTERVAL=0,
+    )
+    app.config.update(config)
+    return app
+
+
+def reset_catalog(app):
+    """
+    stops the refresher, drops the catalog of the process and the pooled
+    client of the app and closes every breaker
+    """
+    if db._refresher is not None:
+        db._refresher.stop()
+        db._refresher.join(5)
+        db._refresher = None
+    with app.app_context():
+        db.ecmgr.close()
+    db._topic_data = None
+    db._topic_data_updated_at = None
+    if db._shared is not None and db._shared.is_publisher:
+        os.close(db._shared._lock_fd)
+    db._shared = None
+    del db._recent_items[:]
+    for upstream in upstreams.values():
+        upstream.breaker.record_success()
+
+
+def login(app, client, permissions=Permission.READ, teams=None):
+    """
+    signs the test client in as bob with the given permissions mask,
+    the way auth keeps a resolved identity in the session
+    """
+    user = User('bob', 'https://avatars/bob', None, teams,
+                permissions=permissions)
+    with app.test_request_context():
+        claim = dump_identity_claim(user)
+    with client.session_transaction() as session:
+        session['user_id'] = user.user_id
+        session[IDENTITY_CLAIM_KEY] = claim
+    return user
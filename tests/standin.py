@@ -0,0 +1,66 @@
+"""
+local stand-in for the upstream http services. serves a handler from a
+background thread so that clients are exercised over real sockets
+"""
+import json
+import socket
+import threading
+from http import HTTPStatus
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class StandIn(object):
+    """
+    calls handler(method, path, environ) for every request, which
+    returns a (status, json body or None, headers) tuple.
+    every request is recorded as a (method, path, environ) tuple in hits
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.hits = []
+        self.url = None
+        self._server = None
+
+    def __enter__(self):
+        self._server = make_server('127.0.0.1', 0, self._app,
+                                   server_class=_Server,
+                                   handler_class=_QuietHandler)
+        self.url = 'http://127.0.0.1:{}/'.format(self._server.server_port)
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _app(self, environ, start_response):
+        method, path = environ['REQUEST_METHOD'], environ['PATH_INFO']
+        self.hits.append((method, path, environ))
+        status, body, headers = self.handler(method, path, environ)
+        payload = b'' if body is None else json.dumps(body).encode()
+        start_response('{} {}'.format(status, HTTPStatus(status).phrase),
+                       [('Content-Type', 'application/json'),
+                        ('Content-Length', str(len(payload)))] +
+                       list(headers.items()))
+        return [payload]
+
+
+def refused_url():
+    """
+    url of a local port nothing listens on
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return 'http://127.0.0.1:{}/'.format(port)
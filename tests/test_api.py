@@ -0,0 +1,97 @@
+import json
+import unittest
+from ecselfservice.models import Permission
+from .helpers import create_test_app, login, reset_catalog
+from .standin import StandIn
+
+CREATED_ON = 1533000000000
+
+APPS = [{'id': '01A{:02d}'.format(i), 'name': 'app{}'.format(i),
+         'createdBy': 'bob', 'createdOn': CREATED_ON + i,
+         'events': [{'name': 'ev{}'.format(j), 'createdBy': 'bob',
+                     'createdOn': CREATED_ON + j} for j in range(3)]}
+        for i in range(5)]
+
+
+class ApiTest(unittest.TestCase):
+
+    def setUp(self):
+        self.standin = StandIn(lambda m, p, e: (200, {'apps': APPS}, {}))
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url)
+        self.client = self.app.test_client()
+        login(self.app, self.client)
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def get(self, url, status=200):
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status, url)
+        return json.loads(res.get_data(as_text=True)) \
+            if status == 200 else None
+
+    def test_applications(self):
+        data = self.get('/api/v1/applications')
+        self.assertEqual([a['id'] for a in data['applications']],
+                         ['01A04', '01A03', '01A02', '01A01', '01A00'])
+        self.assertEqual(data['applications'][0], {
+            'id': '01A04', 'type': 'application', 'name': 'app4',
+            'created_by': 'bob', 'created_on': CREATED_ON + 4})
+        self.assertIsNone(data['next'])
+
+    def test_field_selection(self):
+        data = self.get('/api/v1/applications?fields=name,id')
+        self.assertEqual(data['applications'][0],
+                         {'id': '01A04', 'name': 'app4'})
+        data = self.get('/api/v1/applications/app1/events?fields=name')
+        # events get their identifiers as they are parsed
+        self.assertCountEqual(data['events'],
+                              [{'name': 'ev0'}, {'name': 'ev1'},
+                               {'name': 'ev2'}])
+
+    def test_unknown_fields(self):
+        self.get('/api/v1/applications?fields=id,secret', 400)
+        self.get('/api/v1/applications?fields=,', 400)
+        self.get('/api/v1/applications/app1/events?fields=parent', 400)
+
+    def test_next_cursor(self):
+        data = self.get('/api/v1/applications?limit=5')
+        self.assertEqual(len(data['applications']), 5)
+        self.assertIsNone(data['next'])
+
+        data = self.get('/api/v1/applications?limit=2')
+        self.assertEqual([a['id'] for a in data['applications']],
+                         ['01A04', '01A03'])
+        self.assertEqual(data['next'], '01A03')
+        data = self.get('/api/v1/applications?limit=3&after=01A03')
+        self.assertEqual([a['id'] for a in data['applications']],
+                         ['01A02', '01A01', '01A00'])
+        self.assertIsNone(data['next'])
+
+        data = self.get('/api/v1/applications/app1/events?limit=3')
+        self.assertIsNone(data['next'])
+        data = self.get('/api/v1/applications/app1/events?limit=1')
+        self.assertEqual(data['next'], data['events'][0]['id'])
+
+    def test_filters(self):
+        data = self.get('/api/v1/applications?prefix=app3&fields=name')
+        self.assertEqual(data['applications'], [{'name': 'app3'}])
+        self.get('/api/v1/applications?created_from=soon', 400)
+        self.get('/api/v1/applications?limit=many', 400)
+
+    def test_unknown_application(self):
+        self.get('/api/v1/applications/nope/events', 404)
+
+    def test_requires_read_permission(self):
+        client = self.app.test_client()
+        login(self.app, client, permissions=Permission.UNAUTHORIZED)
+        # unauthorized users are shown the unauthorized page
+        res = client.get('/api/v1/applications')
+        self.assertNotEqual(res.mimetype, 'application/json')
+        self.assertNotIn(b'app4', res.get_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+import os
+import unittest
+from unittest import mock
+import arrow
+from werkzeug.exceptions import BadRequest
+from ecselfservice import catalog as catalog_module, db
+from ecselfservice.applications import page_filters, page_limit
+from ecselfservice.catalog import Catalog
+from ecselfservice.models import Application, Event
+from ecselfservice.snapshot import snapshot_path, write_snapshot
+from .helpers import create_test_app, reset_catalog
+from .standin import StandIn
+
+CREATED_ON = 1533000000000
+
+
+def application(identifier, name, events=()):
+    app = Application(identifier, name, 'bob', CREATED_ON)
+    app.add_events([Event(None, e, 'bob', CREATED_ON, identifier)
+                    .set_parent(app) for e in events])
+    return app
+
+
+class CatalogVersionTest(unittest.TestCase):
+
+    def test_same_content_ignores_event_identifiers(self):
+        old = Catalog([application('01A', 'a', ['x']),
+                       application('01B', 'b')])
+        new = Catalog([application('01A', 'a', ['x']),
+                       application('01B', 'b')])
+        self.assertTrue(new.same_content(old))
+        self.assertFalse(
+            Catalog([application('01A', 'a', ['x', 'y']),
+                     application('01B', 'b')]).same_content(old))
+        self.assertFalse(Catalog([application('01A', 'a', ['x'])])
+                         .same_content(old))
+
+    def test_inherit_versions_of_unchanged_applications(self):
+        old = Catalog([application('01A', 'a', ['x']),
+                       application('01B', 'b')])
+        old.add_event(Event(None, 'y', 'bob', None, '01B')
+                      .set_parent(old.get_application('b')))
+        new = Catalog([application('01A', 'a', ['x']),
+                       application('01B', 'b', ['y', 'z'])])
+        new.inherit_versions(old)
+        self.assertEqual(new.version('01A'), old.version('01A'))
+        self.assertNotEqual(new.version('01B'), old.version('01B'))
+
+        # a later change never reuses a key the application had before
+        before = new.version('01A')
+        new.add_event(Event(None, 'w', 'bob', None, '01A')
+                      .set_parent(new.get_application('a')))
+        self.assertNotEqual(new.version('01A'), before)
+
+
+class RefreshVersionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.apps = [
+            {'id': '01A', 'name': 'a', 'createdBy': 'bob',
+             'createdOn': CREATED_ON, 'events': []},
+            {'id': '01B', 'name': 'b', 'createdBy': 'bob',
+             'createdOn': CREATED_ON, 'events': []},
+        ]
+        self.standin = StandIn(
+            lambda m, p, e: (200, {'apps': self.apps}, {}))
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url)
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def test_unchanged_refresh_keeps_versions(self):
+        with self.app.app_context():
+            version = db.catalog_version()
+            a = db.find_application('a')
+            app_version = db.application_version(a)
+
+            self.assertTrue(db.refresh_data(force=True))
+            self.assertEqual(db.catalog_version(), version)
+            self.assertIs(db.find_application('a'), a)
+
+            self.apps[1]['events'] = [
+                {'name': 'x', 'createdBy': 'bob', 'createdOn': CREATED_ON}]
+            self.assertTrue(db.refresh_data(force=True))
+            self.assertNotEqual(db.catalog_version(), version)
+            self.assertEqual(
+                db.application_version(db.find_application('a')),
+                app_version)
+
+
+class SnapshotReconcileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.standin = StandIn(lambda m, p, e: (200, {'apps': [
+            {'id': '01B', 'name': 'fresh', 'createdBy': 'bob',
+             'createdOn': CREATED_ON, 'events': []}]}, {}))
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url, CATALOG_SNAPSHOT=True)
+        stale = Application('01A', 'stale', 'bob', CREATED_ON)
+        os.makedirs(self.app.instance_path, exist_ok=True)
+        write_snapshot(snapshot_path(self.app), [stale])
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def test_snapshot_is_reconciled(self):
+        with self.app.app_context():
+            catalog = db._get_or_update_data()
+            self.assertEqual([a.name for a in catalog.applications],
+                             ['stale'])
+            db._refresher.join(5)
+            self.assertEqual(
+                [a.name for a in db._get_or_update_data().applications],
+                ['fresh'])
+        self.assertEqual([p for _, p, _ in self.standin.hits],
+                         ['/v1/a/catalog'])
+
+
+DAY = 24 * 60 * 60 * 1000
+NAMES = ['alpha', 'alpine', 'beta', 'bz']
+CREATORS = ['bob', 'eve', 'kim']
+
+
+def paging_catalog():
+    return Catalog([
+        Application('01A{:03d}'.format(i), '{}{}'.format(NAMES[i % 4], i),
+                    CREATORS[i % 3], CREATED_ON + (i % 5) * DAY + i)
+        for i in range(40)])
+
+
+class PageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = paging_catalog()
+
+    def expected(self, prefix=None, created_by=None, created_from=None,
+                 created_to=None):
+        return [a.identifier for a in sorted(
+            self.catalog.applications, key=lambda a: a.identifier,
+            reverse=True)
+            if (prefix is None or a.name.startswith(prefix)) and
+            (created_by is None or a.created_by == created_by) and
+            (created_from is None or a.created_on_ms >= created_from) and
+            (created_to is None or a.created_on_ms <= created_to)]
+
+    def pages(self, limit, **filters):
+        identifiers = []
+        after = None
+        while True:
+            page, after = self.catalog.page(after=after, limit=limit,
+                                            **filters)
+            self.assertLessEqual(len(page), limit)
+            identifiers.extend(a.identifier for a in page)
+            if after is None:
+                return identifiers
+            self.assertEqual(after, page[-1].identifier)
+
+    def test_filters_and_cursor(self):
+        for filters in ({}, {'prefix': 'al'}, {'prefix': 'alp'},
+                        {'prefix': 'alph'}, {'prefix': 'alpha1'},
+                        {'prefix': 'zz'}, {'created_by': 'eve'},
+                        {'created_by': 'nobody'},
+                        {'created_from': CREATED_ON + DAY},
+                        {'created_to': CREATED_ON + 2 * DAY + 20},
+                        {'created_from': CREATED_ON + DAY + 10,
+                         'created_to': CREATED_ON + 3 * DAY},
+                        {'created_from': CREATED_ON + 10 * DAY},
+                        {'prefix': 'b', 'created_by': 'bob',
+                         'created_from': CREATED_ON + DAY}):
+            expected = self.expected(**filters)
+            for limit in (1, 3, 7, 50):
+                self.assertEqual(self.pages(limit, **filters), expected,
+                                 (filters, limit))
+
+    def test_long_prefix_with_many_matches(self):
+        with mock.patch.object(catalog_module, 'NAME_MATCHES_SORTED', 0):
+            for prefix in ('alph', 'alpha1', 'bz'):
+                self.assertEqual(self.pages(2, prefix=prefix),
+                                 self.expected(prefix=prefix), prefix)
+
+    def test_next_cursor_only_with_more_items(self):
+        expected = self.expected(prefix='beta')
+        page, after = self.catalog.page(limit=len(expected), prefix='beta')
+        self.assertEqual([a.identifier for a in page], expected)
+        self.assertIsNone(after)
+        page, after = self.catalog.page(limit=len(expected) - 1,
+                                        prefix='beta')
+        self.assertEqual(after, expected[-2])
+
+    def test_starts_from_the_smallest_index(self):
+        catalog = self.catalog
+        day = (CREATED_ON + DAY) // catalog_module._DAY_MS
+        cases = [
+            ({}, [(catalog.applications, catalog._app_keys)]),
+            ({'prefix': 'alp'}, [catalog._apps_by_prefix['alp']]),
+            # few enough matches of a longer prefix are sorted instead
+            ({'prefix': 'alpha'}, [catalog_module._ordered(
+                a for a in catalog.applications
+                if a.name.startswith('alpha'))]),
+            ({'prefix': 'be', 'created_by': 'bob'},
+             [catalog._apps_by_prefix['be']]),
+            ({'prefix': 'a', 'created_by': 'kim'},
+             [catalog._apps_by_creator['kim']]),
+            ({'created_from': CREATED_ON + DAY,
+              'created_to': CREATED_ON + DAY + 100},
+             [catalog._apps_by_day[day]]),
+        ]
+        for filters, buckets in cases:
+            with mock.patch.object(catalog_module, '_iter_buckets',
+                                   wraps=catalog_module._iter_buckets) as it:
+                list(catalog.iter_applications(**filters))
+            self.assertEqual(it.call_args[0][0], buckets, filters)
+
+    def test_page_reads_up_to_the_page(self):
+        # every index is in identifier order, a page never reads on
+        read = []
+        original = catalog_module._iter_after
+
+        def counting(items, keys, cursor):
+            for item in original(items, keys, cursor):
+                read.append(item)
+                yield item
+
+        with mock.patch.object(catalog_module, '_iter_after', counting):
+            page, after = self.catalog.page(limit=3, created_from=0)
+        self.assertEqual(len(page), 3)
+        # the first items of the five day buckets and the page's own
+        self.assertGreaterEqual(len(read), 4)
+        self.assertLessEqual(len(read), 5 + 4)
+
+
+class PageArgumentsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_test_app('http://127.0.0.1:1/')
+
+    def query(self, url):
+        with self.app.test_request_context(url):
+            return page_filters()[1]
+
+    def test_created_to_covers_the_whole_day(self):
+        end = arrow.get('2018-07-31').shift(days=1)
+        self.assertEqual(
+            self.query('/applications/?created_to=2018-07-31')['created_to'],
+            int(end.float_timestamp * 1000) - 1)
+        self.assertEqual(
+            self.query('/applications/?created_to=2018-07-31T12:00:00%2B00:00')
+            ['created_to'],
+            int(arrow.get('2018-07-31T12:00:00+00:00').float_timestamp *
+                1000))
+        self.assertEqual(
+            self.query('/applications/?created_from=2018-07-31')
+            ['created_from'],
+            int(arrow.get('2018-07-31').float_timestamp * 1000))
+
+    def test_bad_dates(self):
+        for url in ('/applications/?created_from=yesterday',
+                    '/applications/?created_to=2018-13-45'):
+            with self.assertRaises(BadRequest):
+                self.query(url)
+
+    def test_limit(self):
+        with self.app.test_request_context('/applications/?limit=x'):
+            with self.assertRaises(BadRequest):
+                page_limit(20, 100)
+        for value, expected in (('0', 1), ('7', 7), ('1000', 100)):
+            with self.app.test_request_context(
+                    '/applications/?limit=' + value):
+                self.assertEqual(page_limit(20, 100), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
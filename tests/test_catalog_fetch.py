@@ -0,0 +1,166 @@
+import unittest
+from base64 import b64encode
+from ecselfservice import db
+from ecselfservice.catalog import Catalog
+from ecselfservice.db import ECMGRClient
+from ecselfservice.errors import SSBaseError
+from ecselfservice.models import Event
+from ecselfservice.resilience import Upstream
+from .helpers import create_test_app, reset_catalog
+from .standin import StandIn
+
+SECRET = b64encode(b'secret').decode()
+CREATED_ON = 1533000000000
+
+
+def _app(i):
+    return {'id': '01A{:02d}'.format(i), 'name': 'app{}'.format(i),
+            'createdBy': 'bob', 'createdOn': CREATED_ON + i}
+
+
+def _event(name):
+    return {'name': name, 'createdBy': 'bob', 'createdOn': CREATED_ON}
+
+
+APPS = [_app(i) for i in range(3)]
+
+
+def collector(bulk, failing=()):
+    """
+    a stand-in eventcollector, with or without the bulk catalog endpoint.
+    the events of the applications in failing answer 503
+    """
+    def handler(method, path, environ):
+        if path == '/v1/a/catalog':
+            if not bulk:
+                return 404, {'type': 'not-found', 'detail': 'no catalog'}, {}
+            apps = [dict(a, events=[_event('ev_' + a['name'])])
+                    for a in APPS]
+            return 200, {'apps': apps}, {}
+        if path == '/v1/a/apps':
+            return 200, APPS, {}
+        if path.startswith('/v1/a/apps/') and path.endswith('/events'):
+            name = path.split('/')[4]
+            if name in failing:
+                return 503, {'type': 'unavailable', 'detail': name}, {}
+            app = next(a for a in APPS if a['name'] == name)
+            return 200, {'app': app, 'events': [_event('ev_' + name)]}, {}
+        return 404, {}, {}
+    return handler
+
+
+def client(url):
+    return ECMGRClient(SECRET, url, upstream=Upstream('collector', retries=0))
+
+
+class GetCatalogTest(unittest.TestCase):
+
+    def assert_catalog(self, apps):
+        self.assertEqual(sorted(a.name for a in apps),
+                         ['app0', 'app1', 'app2'])
+        for app in apps:
+            self.assertEqual([e.name for e in app.events],
+                             ['ev_' + app.name])
+            for event in app.events:
+                self.assertIs(event.parent_app, app)
+                self.assertEqual(event.parent_app_id, app.identifier)
+
+    def test_bulk_catalog(self):
+        with StandIn(collector(bulk=True)) as standin:
+            c = client(standin.url)
+            apps = c.get_catalog(concurrency=4)
+
+        self.assert_catalog(apps)
+        self.assertTrue(c.catalog_supported)
+        self.assertEqual([path for _, path, _ in standin.hits],
+                         ['/v1/a/catalog'])
+
+    def test_fallback_without_bulk_catalog(self):
+        with StandIn(collector(bulk=False)) as standin:
+            c = client(standin.url)
+            apps = c.get_catalog(concurrency=4)
+            self.assert_catalog(apps)
+            self.assertFalse(c.catalog_supported)
+            paths = sorted(path for _, path, _ in standin.hits)
+            self.assertEqual(paths, ['/v1/a/apps',
+                                     '/v1/a/apps/app0/events',
+                                     '/v1/a/apps/app1/events',
+                                     '/v1/a/apps/app2/events',
+                                     '/v1/a/catalog'])
+
+            # the unsupported endpoint is not asked for again
+            del standin.hits[:]
+            self.assert_catalog(c.get_catalog(concurrency=1))
+            self.assertNotIn('/v1/a/catalog',
+                             [path for _, path, _ in standin.hits])
+
+
+    def test_fallback_fails_if_any_events_fail(self):
+        app = create_test_app('http://127.0.0.1:1/')
+        with StandIn(collector(bulk=False, failing=('app1',))) as standin, \
+                app.app_context():
+            with self.assertRaises(SSBaseError):
+                client(standin.url).get_catalog(concurrency=4)
+
+
+class RefreshEventsFailureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.failing = set()
+        self.standin = StandIn(collector(bulk=False, failing=self.failing))
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url)
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def test_keeps_the_previous_catalog(self):
+        with self.app.app_context():
+            catalog = db._get_or_update_data()
+            self.failing.add('app2')
+            self.assertFalse(db.refresh_data(force=True))
+            self.assertIs(db._get_or_update_data(), catalog)
+            self.assertEqual(
+                [e.name for e in db.find_application('app2').events],
+                ['ev_app2'])
+
+
+def conditional_collector(environ):
+    etag = '"{}"'.format(len(APPS))
+    if environ.get('HTTP_IF_NONE_MATCH') == etag:
+        return 304, None, {'ETag': etag}
+    return 200, {'apps': [dict(a, events=[]) for a in APPS]}, {'ETag': etag}
+
+
+class ConditionalGetTest(unittest.TestCase):
+
+    def test_not_modified_builds_new_models(self):
+        with StandIn(lambda m, p, e: conditional_collector(e)) as standin:
+            c = client(standin.url)
+            first = c.get_catalog()
+            second = c.get_catalog()
+            statuses = [e.get('HTTP_IF_NONE_MATCH') for _, _, e in
+                        standin.hits]
+
+        self.assertEqual(statuses, [None, '"3"'])
+        self.assertEqual([a.name for a in first], [a.name for a in second])
+        for old, new in zip(first, second):
+            self.assertIsNot(old, new)
+            self.assertIsNot(old.events, new.events)
+
+    def test_not_modified_does_not_share_catalog_state(self):
+        with StandIn(lambda m, p, e: conditional_collector(e)) as standin:
+            c = client(standin.url)
+            live = Catalog(c.get_catalog())
+            app = live.get_application('app0')
+            live.add_event(Event(None, 'ev_new', 'bob', None, app.identifier)
+                           .set_parent(app))
+            refreshed = Catalog(c.get_catalog())
+
+        self.assertEqual([e.name for e in app.events], ['ev_new'])
+        self.assertEqual(refreshed.get_application('app0').events, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+
+from flask import g
+
+from ecselfservice import db
+from ecselfservice.errors import DeadlineExceededError
+from ecselfservice.resilience import Upstream
+from .helpers import SECRET, create_test_app, reset_catalog
+from .standin import StandIn
+
+CREATED_ON = 1533000000000
+
+APPS = [{'id': '01A{:02d}'.format(i), 'name': 'app{}'.format(i),
+         'createdBy': 'bob', 'createdOn': CREATED_ON} for i in range(6)]
+
+
+def slow_collector(delay, catalog_delay=None):
+    """
+    a stand-in eventcollector where every application's events take
+    `delay` seconds. it serves the bulk catalog, taking `catalog_delay`
+    seconds, unless that is None
+    """
+    def handler(method, path, environ):
+        if path == '/v1/a/catalog' and catalog_delay is not None:
+            time.sleep(catalog_delay)
+            return 200, {'apps': [dict(a, events=[]) for a in APPS]}, {}
+        if path == '/v1/a/apps':
+            return 200, APPS, {}
+        if path.startswith('/v1/a/apps/') and path.endswith('/events'):
+            time.sleep(delay)
+            name = path.split('/')[4]
+            app = next(a for a in APPS if a['name'] == name)
+            return 200, {'app': app, 'events': []}, {}
+        return 404, {}, {}
+    return handler
+
+
+class ColdLoadTest(unittest.TestCase):
+
+    def start(self, *args):
+        self.standin = StandIn(slow_collector(*args)).__enter__()
+        self.addCleanup(self.standin.__exit__, None, None, None)
+        self.app = create_test_app(self.standin.url, REQUEST_DEADLINE=0.3,
+                                   ECMGR_FETCH_CONCURRENCY=2)
+        reset_catalog(self.app)
+        self.addCleanup(reset_catalog, self.app)
+
+    def load(self):
+        with self.app.test_request_context('/'):
+            self.app.preprocess_request()
+            deadline = g.deadline
+            catalog = db._get_or_update_data()
+            self.assertEqual(g.deadline, deadline)
+        self.assertEqual(len(catalog.applications), len(APPS))
+        self.assertIs(db._topic_data, catalog)
+
+    def test_slow_catalog_outlives_the_request_deadline(self):
+        self.start(0, 0.5)
+        self.load()
+
+    def test_slow_fan_out_outlives_the_request_deadline(self):
+        self.start(0.2)
+        self.load()
+
+    def test_refresh_is_bounded_by_the_request_deadline(self):
+        self.start(0.2)
+        with self.app.test_request_context('/'):
+            self.app.preprocess_request()
+            db._get_or_update_data()
+            g.deadline = time.monotonic() + 0.3
+            self.assertFalse(db.refresh_data(force=True))
+
+
+class FetchAllEventsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_test_app('http://127.0.0.1:1/')
+
+    def test_fan_out_is_bounded_by_the_deadline(self):
+        with StandIn(slow_collector(0.2)) as standin, \
+                self.app.app_context():
+            client = db.ECMGRClient(SECRET, standin.url,
+                                    upstream=Upstream('collector', retries=0))
+            apps = list(client.get_apps())
+            g.deadline = time.monotonic() + 0.3
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceededError):
+                db.fetch_all_events(client, apps, concurrency=2)
+            self.assertLess(time.monotonic() - started, 0.45)
+            self.assertLess(len(standin.hits), 1 + len(APPS))
+
+    def test_fan_out_without_deadline(self):
+        with StandIn(slow_collector(0)) as standin, self.app.app_context():
+            client = db.ECMGRClient(SECRET, standin.url,
+                                    upstream=Upstream('collector', retries=0))
+            apps = list(client.get_apps())
+            results = db.fetch_all_events(client, apps, concurrency=2)
+        self.assertEqual([error for _, error in results], [None] * len(APPS))
+
+
+if __name__ == '__main__':
+    unittest.main()
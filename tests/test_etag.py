@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+from ecselfservice import db
+from ecselfservice.models import Event, Permission
+from .helpers import create_test_app, login, reset_catalog
+from .standin import StandIn
+
+CREATED_ON = 1533000000000
+
+APPS = [{'id': '01A', 'name': 'a', 'createdBy': 'bob',
+         'createdOn': CREATED_ON,
+         'events': [{'name': 'x', 'createdBy': 'bob',
+                     'createdOn': CREATED_ON}]}]
+
+
+def collector(method, path, environ):
+    if method == 'POST' and path.startswith('/v1/a/apps/'):
+        return 200, {'name': path.split('/')[-1], 'createdBy': 'bob',
+                     'createdOn': CREATED_ON}, {}
+    return 200, {'apps': APPS}, {}
+
+
+class CatalogEtagTest(unittest.TestCase):
+
+    def setUp(self):
+        self.standin = StandIn(collector)
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url)
+        self.client = self.app.test_client()
+        login(self.app, self.client)
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def get(self, url, etag=None, status=200):
+        headers = {'If-None-Match': '"{}"'.format(etag)} if etag else {}
+        res = self.client.get(url, headers=headers)
+        self.assertEqual(res.status_code, status, url)
+        etag, weak = res.get_etag()
+        self.assertFalse(weak)
+        self.assertIn('no-cache', res.headers['Cache-Control'])
+        return etag
+
+    def test_not_modified_without_rendering(self):
+        for url in ('/applications/', '/applications/events/all/',
+                    '/applications/a/events/'):
+            etag = self.get(url)
+            with mock.patch('ecselfservice.applications.render_template',
+                            side_effect=AssertionError('rendered')):
+                self.assertEqual(self.get(url, etag, status=304), etag)
+            # another page has its own etag
+            self.assertNotEqual(self.get(url + '?limit=1'), etag)
+
+    def test_new_etag_after_add_event(self):
+        etag = self.get('/applications/')
+        with self.app.app_context():
+            app = db.find_application('a')
+            db.add_event(Event(None, 'y', 'bob', None, app.identifier)
+                         .set_parent(app))
+        self.assertNotEqual(self.get('/applications/', etag), etag)
+
+    def test_new_etag_after_permission_change(self):
+        etag = self.get('/applications/')
+        login(self.app, self.client,
+              permissions=Permission.READ | Permission.WRITE)
+        self.assertNotEqual(self.get('/applications/', etag), etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
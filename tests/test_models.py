@@ -0,0 +1,73 @@
+import unittest
+import arrow
+from ecselfservice.models import (
+    Application,
+    Event,
+    decode_millis,
+    decode_millis_many,
+    get_date,
+)
+
+
+def float_timestamp_millis(value):
+    # how serialize computed created_on before it was stored as millis
+    return int(round(arrow.get(value).float_timestamp * 1000))
+
+
+class SerializeTest(unittest.TestCase):
+
+    def test_iso_dates_round_to_the_millisecond(self):
+        for value in ('2018-10-08T12:00:00.0006+00:00',
+                      '2018-10-08T12:00:00.0004+00:00',
+                      '2018-10-08T12:00:00.9996+00:00',
+                      '2018-10-08T14:00:00.123456+02:00',
+                      '2018-10-08T12:00:00+00:00'):
+            expected = float_timestamp_millis(value)
+            app = Application('01A', 'a', 'bob', value)
+            event = Event('01E', 'e', 'bob', value, '01A')
+            self.assertEqual(app.serialize()['created_on'], expected, value)
+            self.assertEqual(event.serialize()['created_on'], expected, value)
+
+    def test_serialize(self):
+        app = Application('01A', 'a', 'bob', 1539000000123)
+        event = Event('01E', 'e', 'bob', 1539000000004, None).set_parent(app)
+        self.assertEqual(app.serialize(), {
+            'id': '01A', 'type': 'application', 'name': 'a',
+            'created_by': 'bob', 'created_on': 1539000000123,
+        })
+        self.assertEqual(event.serialize(), {
+            'id': '01E', 'type': 'event', 'parent_id': '01A', 'name': 'e',
+            'created_by': 'bob', 'created_on': 1539000000004,
+        })
+        self.assertEqual(app.created_on,
+                         arrow.get('2018-10-08T12:00:00.123+00:00'))
+
+
+class DecodeMillisTest(unittest.TestCase):
+
+    def test_units(self):
+        expected = 1539000000500
+        self.assertEqual(decode_millis(1539000000500), expected)
+        self.assertEqual(decode_millis('1539000000500'), expected)
+        self.assertEqual(decode_millis('2018-10-08T12:00:00.500+00:00'),
+                         expected)
+        self.assertEqual(decode_millis(arrow.get(1539000000.5)), expected)
+        self.assertEqual(
+            decode_millis(arrow.get(1539000000.5).datetime.replace(
+                tzinfo=None)), expected)
+
+    def test_floats_are_epoch_seconds(self):
+        for value in (1539000000.5, 1539000000.0, 1539000000.0006):
+            self.assertEqual(decode_millis(value),
+                             float_timestamp_millis(value), value)
+        self.assertEqual(get_date(1539000000.5), arrow.get(1539000000.5))
+
+    def test_many(self):
+        self.assertEqual(
+            decode_millis_many([1539000000500, 1539000000.5,
+                                '2018-10-08T12:00:00.500+00:00']),
+            [1539000000500] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+fault injection against a stand-in upstream: errors, slow responses and
+refused connections
+"""
+import time
+import unittest
+
+import requests
+
+from ecselfservice.errors import UpstreamUnavailableError
+from ecselfservice.resilience import CircuitBreaker, Upstream
+from .standin import StandIn, refused_url
+
+
+class Interrupted(BaseException):
+    """
+    stands in for gevent.Timeout and GreenletExit
+    """
+
+
+def faults(*responses):
+    """
+    a handler answering with the given (status, delay) responses in turn,
+    then 200 right away
+    """
+    responses = list(responses)
+
+    def handler(method, path, environ):
+        status, delay = responses.pop(0) if responses else (200, 0)
+        time.sleep(delay)
+        return status, {'status': status}, {}
+    return handler
+
+
+def upstream(**policy):
+    settings = dict(connect_timeout=0.5, read_timeout=0.2, retries=2,
+                    backoff=0, failure_threshold=10, reset_timeout=0.2)
+    settings.update(policy)
+    return Upstream('test', **settings)
+
+
+def get(url):
+    return lambda timeout: requests.get(url, timeout=timeout)
+
+
+def post(url):
+    return lambda timeout: requests.post(url, json={}, timeout=timeout)
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_unavailable_is_retried(self):
+        with StandIn(faults((503, 0), (503, 0))) as server:
+            res = upstream().call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(server.hits), 3)
+
+    def test_gives_up_after_retries(self):
+        with StandIn(faults(*[(503, 0)] * 5)) as server:
+            res = upstream().call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(len(server.hits), 3)
+
+    def test_server_error_is_not_retried(self):
+        with StandIn(faults((500, 0))) as server:
+            res = upstream().call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(len(server.hits), 1)
+
+    def test_slow_response_is_retried(self):
+        with StandIn(faults((200, 0.5))) as server:
+            res = upstream().call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(server.hits), 2)
+
+    def test_refused_connection_is_retried(self):
+        target = upstream()
+        with self.assertRaises(requests.ConnectionError):
+            target.call(get(refused_url()), idempotent=True)
+        self.assertEqual(target.breaker.failures, 3)
+
+    def test_post_is_not_retried(self):
+        with StandIn(faults((503, 0))) as server:
+            res = upstream().call(post(server.url))
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(len(server.hits), 1)
+
+    def test_slow_post_is_not_retried(self):
+        with StandIn(faults((200, 0.5))) as server:
+            with self.assertRaises(requests.Timeout):
+                upstream().call(post(server.url))
+        self.assertEqual(len(server.hits), 1)
+
+    def test_refused_post_is_not_retried(self):
+        target = upstream()
+        with self.assertRaises(requests.ConnectionError):
+            target.call(post(refused_url()))
+        self.assertEqual(target.breaker.failures, 1)
+
+
+class BreakerTest(unittest.TestCase):
+
+    def open_breaker(self, server, target):
+        for _ in range(target.breaker.failure_threshold):
+            target.call(get(server.url), idempotent=True)
+        self.assertEqual(target.breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_and_fails_fast(self):
+        target = upstream(retries=0, failure_threshold=2, reset_timeout=30)
+        with StandIn(faults(*[(503, 0)] * 5)) as server:
+            self.open_breaker(server, target)
+            hits = len(server.hits)
+            started = time.monotonic()
+            with self.assertRaises(UpstreamUnavailableError):
+                target.call(get(server.url), idempotent=True)
+            self.assertLess(time.monotonic() - started, 0.1)
+            self.assertEqual(len(server.hits), hits)
+        self.assertEqual(target.breaker.stats()['rejected'], 1)
+
+    def test_recovers(self):
+        target = upstream(retries=0, failure_threshold=2)
+        with StandIn(faults((503, 0), (503, 0))) as server:
+            self.open_breaker(server, target)
+            time.sleep(target.breaker.reset_timeout)
+            res = target.call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(target.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_opens_again(self):
+        target = upstream(retries=0, failure_threshold=2)
+        with StandIn(faults((503, 0), (503, 0), (503, 0))) as server:
+            self.open_breaker(server, target)
+            time.sleep(target.breaker.reset_timeout)
+            target.call(get(server.url), idempotent=True)
+            self.assertEqual(target.breaker.state, CircuitBreaker.OPEN)
+            with self.assertRaises(UpstreamUnavailableError):
+                target.call(get(server.url), idempotent=True)
+            self.assertEqual(len(server.hits), 3)
+
+    def test_interrupted_trial_does_not_wedge(self):
+        target = upstream(retries=0, failure_threshold=2)
+
+        def interrupted(timeout):
+            raise Interrupted()
+
+        with StandIn(faults((503, 0), (503, 0))) as server:
+            self.open_breaker(server, target)
+            time.sleep(target.breaker.reset_timeout)
+            with self.assertRaises(Interrupted):
+                target.call(interrupted, idempotent=True)
+            self.assertEqual(target.breaker.state, CircuitBreaker.OPEN)
+            res = target.call(get(server.url), idempotent=True)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(target.breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from unittest import mock
+
+from ecselfservice import db
+from tests.helpers import create_test_app
+
+
+class RosterRefresherTest(unittest.TestCase):
+
+    def setUp(self):
+        db._roster_refresher = None
+        self.addCleanup(setattr, db, '_roster_refresher', None)
+
+    def start(self, **config):
+        app = create_test_app('http://127.0.0.1:1/',
+                              ROSTER_REFRESH_INTERVAL=300, **config)
+        with mock.patch.object(db.RosterRefresher, 'start') as start, \
+                app.app_context():
+            db._start_roster_refresher()
+        return start
+
+    def test_not_started_without_token(self):
+        start = self.start(GITHUB_ROSTER_TOKEN=None)
+        start.assert_not_called()
+        self.assertIsNone(db._roster_refresher)
+
+    def test_started_with_token(self):
+        start = self.start(GITHUB_ROSTER_TOKEN='token')
+        start.assert_called_once_with()
+        self.assertEqual(db._roster_refresher.interval, 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+from ecselfservice import db
+from ecselfservice.models import Application
+from ecselfservice.shared import SharedSnapshot
+from .helpers import create_test_app, reset_catalog
+from .standin import StandIn
+
+CREATED_ON = 1533000000000
+
+
+def application(identifier, name):
+    return Application(identifier, name, 'bob', CREATED_ON)
+
+
+def names(catalog):
+    return sorted(a.name for a in catalog.applications)
+
+
+class SharedSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.publisher = SharedSnapshot(path)
+        self.reader = SharedSnapshot(path)
+
+    def test_single_publisher(self):
+        self.assertTrue(self.publisher.acquire_publisher())
+        self.assertTrue(self.publisher.acquire_publisher())
+        self.assertFalse(self.reader.acquire_publisher())
+        self.assertTrue(self.publisher.is_publisher)
+        self.assertFalse(self.reader.is_publisher)
+        with self.assertRaises(RuntimeError):
+            self.reader.publish([])
+
+    def test_generations(self):
+        self.publisher.acquire_publisher()
+        self.assertIsNone(self.reader.load())
+        self.assertFalse(self.reader.is_stale())
+
+        self.assertEqual(self.publisher.publish([application('01A', 'a')]),
+                         1)
+        self.assertTrue(self.reader.is_stale())
+        generation, _, apps = self.reader.load()
+        self.assertEqual((generation, [a.name for a in apps]), (1, ['a']))
+        self.assertFalse(self.reader.is_stale())
+
+        self.assertEqual(self.publisher.publish([application('01B', 'b')]),
+                         2)
+        self.assertEqual(self.reader.generation(), 2)
+        self.assertTrue(self.reader.is_stale())
+
+
+class SharedFetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.apps = [{'id': '01A', 'name': 'a', 'createdBy': 'bob',
+                      'createdOn': CREATED_ON, 'events': []}]
+        self.standin = StandIn(
+            lambda m, p, e: (200, {'apps': self.apps}, {}))
+        self.standin.__enter__()
+        self.app = create_test_app(self.standin.url,
+                                   CATALOG_SHARED_FETCH=True,
+                                   CATALOG_SHARED_FETCH_POLL_INTERVAL=0)
+        self.other = SharedSnapshot(self.app.instance_path)
+
+    def tearDown(self):
+        reset_catalog(self.app)
+        self.standin.__exit__(None, None, None)
+
+    def test_publisher_fetches_and_publishes(self):
+        with self.app.app_context():
+            self.assertEqual(names(db._get_or_update_data()), ['a'])
+            self.assertTrue(db._shared.is_publisher)
+        self.assertEqual(len(self.standin.hits), 1)
+        self.assertEqual(self.other.generation(), 1)
+        self.assertFalse(self.other.acquire_publisher())
+
+        with self.app.app_context():
+            # an unchanged catalog is not published again
+            self.assertTrue(db.refresh_data(force=True))
+            self.assertEqual(self.other.generation(), 1)
+
+            self.apps.append({'id': '01B', 'name': 'b', 'createdBy': 'bob',
+                              'createdOn': CREATED_ON, 'events': []})
+            self.assertTrue(db.refresh_data(force=True))
+        self.assertEqual(self.other.generation(), 2)
+        self.assertEqual([a.name for a in self.other.load()[2]],
+                         ['b', 'a'])
+
+    def test_worker_loads_the_published_snapshot(self):
+        self.other.acquire_publisher()
+        self.other.publish([application('01A', 'a')])
+        with self.app.app_context():
+            self.assertEqual(names(db._get_or_update_data()), ['a'])
+            self.assertFalse(db._shared.is_publisher)
+            # nothing new has been published
+            self.assertFalse(db.refresh_data())
+
+            self.other.publish([application('01A', 'a'),
+                                application('01B', 'b')])
+            self.assertTrue(db.refresh_data())
+            self.assertEqual(names(db._get_or_update_data()), ['a', 'b'])
+        self.assertEqual(self.standin.hits, [])
+
+    def test_worker_replays_its_own_additions(self):
+        self.other.acquire_publisher()
+        self.other.publish([application('01A', 'a')])
+        with self.app.app_context():
+            db._get_or_update_data()
+            db._get_or_update_data(item_to_append=application('01C', 'c'))
+            self.assertEqual(len(db._recent_items), 1)
+
+            # published before the publisher has seen c
+            self.other.publish([application('01A', 'a'),
+                                application('01B', 'b')])
+            self.assertTrue(db.refresh_data())
+            self.assertEqual(names(db._get_or_update_data()),
+                             ['a', 'b', 'c'])
+
+            # published after c was added, which it now includes
+            later = time.time() + 5
+            with mock.patch('ecselfservice.snapshot.time.time',
+                            return_value=later):
+                self.other.publish([application('01A', 'a'),
+                                    application('01C', 'c')])
+            self.assertTrue(db.refresh_data())
+            self.assertEqual(names(db._get_or_update_data()), ['a', 'c'])
+            self.assertEqual(db._recent_items, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
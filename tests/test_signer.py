@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from ecselfservice.signer import CHUNK_SIZE, Signer, sign
+from tests.helpers import SECRET
+
+PAYLOAD = '{"name": "café"}'
+LARGE = PAYLOAD.encode('utf-8') * 4000
+
+# (method, url, payload, items, signature computed by the reference sign)
+VECTORS = [
+    ('GET', '/applications', '', None,
+     '/0Rbhhnvbol4FxVrb0Fcf1jN+st1GP3m3gGZTVF5+G0='),
+    ('GET', 'applications', '', ['app'],
+     'ZF8oCPX90JZf2qMGzXCf2gJP3BmrU1Tgv9Je+/sqROg='),
+    ('POST', '/applications', PAYLOAD, None,
+     'q0VSUFZAwgneSUuRdwfIocpiiIBZcSw/L3AhqqE2nH0='),
+    ('POST', '/applications', PAYLOAD, ['app', 'user'],
+     'wEQzRlKYP8k8TdFOAuHuv3iSfHBmMh0kVR+ZCMm/5h4='),
+    ('POST', '/applications/01A/events', LARGE, ['app'],
+     'Ne4JR3/CKiR6o0DuY9XY+q+Z7tx3EZuGS0eRE9YPdFs='),
+]
+
+
+def payload_forms(payload):
+    """
+    the same payload as str, bytes, memoryview, file and chunks
+    """
+    data = payload.encode('utf-8') if isinstance(payload, str) else payload
+    forms = [
+        ('bytes', lambda: data),
+        ('bytearray', lambda: bytearray(data)),
+        ('memoryview', lambda: memoryview(data)),
+        ('file', lambda: io.BytesIO(data)),
+        ('chunks', lambda: [data[i:i + 1000]
+                            for i in range(0, len(data), 1000)]),
+    ]
+    if isinstance(payload, str):
+        forms.append(('str', lambda: payload))
+        forms.append(('str chunks', lambda: [payload[:3], payload[3:]]))
+    return forms
+
+
+class SignerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.signer = Signer(SECRET)
+
+    def test_reference_vectors(self):
+        for method, url, payload, items, expected in VECTORS:
+            self.assertEqual(sign(method, url, payload, items, SECRET),
+                             expected, (method, url, items))
+
+    def test_matches_reference(self):
+        for method, url, payload, items, expected in VECTORS:
+            for name, form in payload_forms(payload):
+                self.assertEqual(
+                    self.signer.sign(method, url, form(), items), expected,
+                    (method, url, items, name))
+
+    def test_empty_payload(self):
+        expected = sign('GET', '/applications', '', None, SECRET)
+        for payload in (b'', memoryview(b''), io.BytesIO(), [], iter(())):
+            self.assertEqual(
+                self.signer.sign('GET', '/applications', payload), expected)
+
+    def test_file_larger_than_a_chunk(self):
+        data = b'x' * (CHUNK_SIZE * 2 + 1)
+        self.assertEqual(
+            self.signer.sign('POST', '/applications', io.BytesIO(data)),
+            sign('POST', '/applications', data, None, SECRET))
+
+    def test_empty_items(self):
+        self.assertEqual(
+            self.signer.sign('GET', '/applications', '', []),
+            sign('GET', '/applications', '', [], SECRET))
+
+    def test_sign_many(self):
+        requests = [(method, url, payload)
+                    for method, url, payload, items, _ in VECTORS]
+        self.assertEqual(self.signer.sign_many(requests),
+                         [sign(method, url, payload, None, SECRET)
+                          for method, url, payload in requests])
+        self.assertEqual(self.signer.sign_many(requests, ['app']),
+                         [sign(method, url, payload, ['app'], SECRET)
+                          for method, url, payload in requests])
+
+    def test_reusable(self):
+        method, url, payload, items, expected = VECTORS[3]
+        for _ in range(3):
+            self.assertEqual(self.signer.sign(method, url, payload, items),
+                             expected)
+
+
+if __name__ == '__main__':
+    unittest.main()